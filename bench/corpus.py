@@ -0,0 +1,111 @@
+"""
+Synthetic markdown sites used by the benchmarks in this directory.
+"""
+import os
+import random
+
+WORDS = (
+    "the elves of rivendell sang beneath the stars while tom bombadil walked "
+    "the old forest and glorfindel rode west to the ford of bruinen"
+).split()
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+def inline_span(rng, word, link_ratio, image_ratio):
+    if rng.random() < link_ratio:
+        if rng.random() < image_ratio:
+            return f"![{word}](/images/{word}.png)"
+        return f"[{word}](/blog/{word})"
+    kind = rng.randrange(3)
+    if kind == 0:
+        return f"**{word}**"
+    if kind == 1:
+        return f"_{word}_"
+    return f"`{word}`"
+
+
+def sentence(rng, words=12, inline_density=0.2, link_ratio=0.4, image_ratio=0.5):
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() < inline_density:
+            word = inline_span(rng, word, link_ratio, image_ratio)
+        parts.append(word)
+    return " ".join(parts)
+
+
+def generate_markdown(rng, blocks=40, inline_density=0.2, link_ratio=0.4, image_ratio=0.5):
+    def text(words):
+        return sentence(rng, words, inline_density, link_ratio, image_ratio)
+
+    lines = [f"# {sentence(rng, 4, 0)}"]
+    for i in range(blocks):
+        kind = i % 6
+        if kind == 0:
+            lines.append(f"## {text(5)}")
+        elif kind == 1:
+            lines.append("\n".join(f"- {text(8)}" for _ in range(5)))
+        elif kind == 2:
+            lines.append("\n".join(f"{n}. {text(8)}" for n in range(1, 6)))
+        elif kind == 3:
+            lines.append("\n".join(f"> {text(10)}" for _ in range(3)))
+        elif kind == 4:
+            lines.append("```\n" + "\n".join(sentence(rng, 6, 0) for _ in range(4)) + "\n```")
+        else:
+            lines.append("\n".join(text(14) for _ in range(4)))
+    return "\n\n".join(lines) + "\n"
+
+
+def generate_corpus(pages, blocks=40, inline_density=0.2, seed=0, link_ratio=0.4, image_ratio=0.5):
+    rng = random.Random(seed)
+    return [
+        generate_markdown(rng, blocks, inline_density, link_ratio, image_ratio)
+        for _ in range(pages)
+    ]
+
+
+def page_path(index, depth, fanout=10):
+    """
+    Spreads pages over nested section directories, `depth` levels deep.
+    """
+    parts = []
+    n = index
+    for _ in range(depth):
+        parts.append(f"section{n % fanout}")
+        n //= fanout
+    parts.append(f"page{index}")
+    return os.path.join(*parts, "index.md")
+
+
+def write_site(root, corpus, depth=2, static_files=20, static_size=64 * 1024, seed=0):
+    """
+    Lays out a corpus as a site under root: content/, static/ and template.html.
+    """
+    rng = random.Random(seed)
+    content_dir = os.path.join(root, "content")
+    for index, markdown in enumerate(corpus):
+        path = os.path.join(content_dir, page_path(index, depth))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(markdown)
+    images_dir = os.path.join(root, "static", "images")
+    os.makedirs(images_dir, exist_ok=True)
+    with open(os.path.join(root, "static", "index.css"), "w") as file:
+        file.write("body { margin: 0 auto; max-width: 40em; }\n" * 50)
+    for i in range(static_files):
+        with open(os.path.join(images_dir, f"image{i}.png"), "wb") as file:
+            file.write(rng.randbytes(static_size))
+    with open(os.path.join(root, "template.html"), "w") as file:
+        file.write(TEMPLATE)
@@ -0,0 +1,58 @@
+"""
+Measures the memory held by parsed pages: every page of a synthetic corpus is
+converted to TextNodes and an HTMLNode tree, and all of them are kept alive.
+
+    python3 bench/memory.py --pages 500 --blocks 40
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from corpus import generate_corpus  # noqa: E402
+from inline_markdown import text_to_textnodes  # noqa: E402
+from markdown_blocks import markdown_to_blocks, markdown_to_html_node  # noqa: E402
+
+
+def measure(corpus):
+    tracemalloc.start()
+    start = time.perf_counter()
+    text_nodes = []
+    trees = []
+    for markdown in corpus:
+        for block in markdown_to_blocks(markdown):
+            text_nodes.append(text_to_textnodes(block.replace("\n", " ")))
+        trees.append(markdown_to_html_node(markdown))
+    elapsed = time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = snapshot.statistics("filename")
+    return {
+        "seconds": round(elapsed, 3),
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "live_allocations": sum(stat.count for stat in stats),
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--blocks", type=int, default=40)
+    parser.add_argument("--inline-density", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    corpus = generate_corpus(args.pages, args.blocks, args.inline_density, args.seed)
+    result = {"pages": args.pages, "blocks": args.blocks, **measure(corpus)}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
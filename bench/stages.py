@@ -0,0 +1,196 @@
+"""
+Times each stage of the build pipeline on a synthetic site and prints the
+results as JSON, so runs can be compared between versions.
+
+    python3 bench/stages.py --pages 2000 --blocks 40 --output bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+import markdown_blocks  # noqa: E402
+from corpus import generate_corpus, write_site  # noqa: E402
+from main import copy_static  # noqa: E402
+from page_generator import read_file, write_file  # noqa: E402
+from template import Template  # noqa: E402
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+
+    def add(self, stage, seconds, calls=1):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + calls
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return timed
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SRC_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(root, timer):
+    content_dir = os.path.join(root, "content")
+    docs_dir = os.path.join(root, "docs")
+    template = Template.from_file(os.path.join(root, "template.html"), "/site/")
+
+    # The block and inline stages run inside markdown_to_html_node, so they are
+    # timed by wrapping the module-level functions it calls. Splitting into
+    # blocks is the iteration of BlockReader, which calls block_to_block_type
+    # for each block it yields; that time is counted under block_to_block_type.
+    class TimedBlockReader(markdown_blocks.BlockReader):
+        def __iter__(self):
+            blocks = super().__iter__()
+            seconds = 0.0
+            nested = timer.seconds.get("block_to_block_type", 0.0)
+            while True:
+                start = time.perf_counter()
+                try:
+                    block = next(blocks)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += time.perf_counter() - start
+                yield block
+            seconds -= timer.seconds.get("block_to_block_type", 0.0) - nested
+            timer.add("markdown_to_blocks", seconds)
+
+    nested = ["block_to_block_type", "text_to_textnodes"]
+    originals = {name: getattr(markdown_blocks, name) for name in nested}
+    originals["BlockReader"] = markdown_blocks.BlockReader
+    for name in nested:
+        setattr(markdown_blocks, name, timer.wrap(name, originals[name]))
+    markdown_blocks.BlockReader = TimedBlockReader
+    try:
+        for dirpath, _, files in os.walk(content_dir):
+            for file in files:
+                source = os.path.join(dirpath, file)
+                dest = os.path.join(docs_dir, os.path.relpath(dirpath, content_dir), "index.html")
+
+                start = time.perf_counter()
+                markdown = read_file(source)
+                timer.add("read", time.perf_counter() - start)
+
+                start = time.perf_counter()
+                node = markdown_blocks.markdown_to_html_node(markdown)
+                timer.add("parse", time.perf_counter() - start)
+
+                start = time.perf_counter()
+                html = node.to_html()
+                timer.add("to_html", time.perf_counter() - start)
+
+                start = time.perf_counter()
+                page = template.render(Title=markdown_blocks.extract_title(markdown), Content=html)
+                timer.add("template_fill", time.perf_counter() - start)
+
+                start = time.perf_counter()
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                write_file(dest, page)
+                timer.add("write", time.perf_counter() - start)
+    finally:
+        for name, func in originals.items():
+            setattr(markdown_blocks, name, func)
+
+    start = time.perf_counter()
+    copy_static(os.path.join(root, "static"), docs_dir)
+    timer.add("copy_static", time.perf_counter() - start)
+
+
+def report(timer, pages, markdown_bytes, static_bytes):
+    # parse includes the nested stages; report only the remainder under block_to_html.
+    nested = sum(timer.seconds.get(name, 0.0) for name in ("markdown_to_blocks", "block_to_block_type", "text_to_textnodes"))
+    timer.seconds["block_to_html"] = timer.seconds.pop("parse") - nested
+    timer.calls["block_to_html"] = timer.calls.pop("parse")
+    stages = {}
+    for stage, seconds in timer.seconds.items():
+        size = static_bytes if stage == "copy_static" else markdown_bytes
+        stages[stage] = {
+            "seconds": round(seconds, 4),
+            "calls": timer.calls[stage],
+            "pages_per_second": round(pages / seconds, 1) if seconds and stage != "copy_static" else None,
+            "mb_per_second": round(size / seconds / 1e6, 2) if seconds else None,
+        }
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--blocks", type=int, default=40, help="blocks per page")
+    parser.add_argument("--inline-density", type=float, default=0.2, help="share of words with inline markup")
+    parser.add_argument("--link-ratio", type=float, default=0.4, help="share of inline markup that is a link or image")
+    parser.add_argument("--image-ratio", type=float, default=0.5, help="share of links that are images")
+    parser.add_argument("--depth", type=int, default=2, help="nesting depth of content directories")
+    parser.add_argument("--static-files", type=int, default=20)
+    parser.add_argument("--static-size", type=int, default=64 * 1024, help="bytes per static file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(
+        args.pages, args.blocks, args.inline_density, args.seed, args.link_ratio, args.image_ratio
+    )
+    markdown_bytes = sum(len(markdown.encode()) for markdown in corpus)
+    root = tempfile.mkdtemp(prefix="ssg-bench-")
+    try:
+        write_site(root, corpus, args.depth, args.static_files, args.static_size, args.seed)
+        del corpus
+        timer = StageTimer()
+        start = time.perf_counter()
+        # Keep the per-file progress output of the build off stdout, which carries the JSON.
+        with contextlib.redirect_stdout(sys.stderr):
+            run(root, timer)
+        total = time.perf_counter() - start
+    finally:
+        shutil.rmtree(root)
+
+    result = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "markdown_bytes": markdown_bytes,
+        "total_seconds": round(total, 4),
+        "pages_per_second": round(args.pages / total, 1),
+        "mb_per_second": round(markdown_bytes / total / 1e6, 2),
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "stages": report(timer, args.pages, markdown_bytes, args.static_files * args.static_size),
+    }
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
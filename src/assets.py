@@ -0,0 +1,97 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from build_manifest import hash_file
+
+# Static files served under a name that changes with their content, so they
+# can be cached by browsers indefinitely.
+FINGERPRINT_EXTENSIONS = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+FINGERPRINT_CHARS = 10
+# The URL of a url() reference in a stylesheet, without its query or fragment.
+CSS_URL_PATTERN = re.compile(r"""(url\(\s*['"]?)([^'"()?#\s]+)""")
+
+
+def fingerprint_name(path, source_hash):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{source_hash[:FINGERPRINT_CHARS]}{ext}"
+
+
+class AssetMap:
+    """
+    The fingerprinted name of every asset of the site. `urls` maps the
+    root-relative URL an asset is referenced by to the URL it is served at,
+    `sources` maps its path in the static directory to its file name and
+    content hash, and `source_urls` maps that path to its URL. `digest`
+    changes whenever any URL does.
+    """
+
+    def __init__(self):
+        self.urls = {}
+        self.sources = {}
+        self.source_urls = {}
+        self.digest = None
+
+    def add(self, url, source, source_hash):
+        self.urls[url] = fingerprint_name(url, source_hash)
+        self.sources[source] = (fingerprint_name(os.path.basename(source), source_hash), source_hash)
+        self.source_urls[source] = url
+
+    def rewrite_css(self, css, source):
+        """
+        Points the url() references of the stylesheet at source to the
+        fingerprinted names of the assets they reference. Relative references
+        are resolved against the stylesheet's URL and stay relative, which
+        fingerprinting keeps valid as it only renames files.
+        """
+        directory = posixpath.dirname(self.source_urls[source])
+
+        def replace(match):
+            reference = match.group(2)
+            # Leave URLs with a scheme or host alone.
+            if reference.startswith("//") or ":" in reference.split("/", 1)[0]:
+                return match.group(0)
+            url = posixpath.normpath(posixpath.join(directory, reference))
+            served = self.urls.get(url)
+            if served is None:
+                return match.group(0)
+            return match.group(1) + posixpath.join(posixpath.dirname(reference), posixpath.basename(served))
+
+        return CSS_URL_PATTERN.sub(replace, css)
+
+    def finish(self):
+        digest = hashlib.sha256()
+        for url in sorted(self.urls):
+            digest.update(f"{url} {self.urls[url]}\n".encode())
+        self.digest = digest.hexdigest()
+
+
+def fingerprint_assets(static_dir, manifest=None):
+    """
+    Hashes every asset in static_dir and returns an AssetMap. With a manifest,
+    the hash stored by the previous build is reused for files whose size and
+    mtime are unchanged, so only new and modified assets are read.
+    """
+    previous = {}
+    if manifest is not None:
+        for record in manifest.previous.values():
+            if "source_hash" in record and "size" in record:
+                previous[record["source"]] = record
+    assets = AssetMap()
+    for root, dirs, files in os.walk(static_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.lower().endswith(FINGERPRINT_EXTENSIONS):
+                continue
+            source = os.path.join(root, file)
+            stat = os.stat(source)
+            record = previous.get(source, {})
+            if record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns:
+                source_hash = record["source_hash"]
+            else:
+                source_hash = hash_file(source)
+            url = "/" + os.path.relpath(source, static_dir).replace(os.sep, "/")
+            assets.add(url, source, source_hash)
+    assets.finish()
+    return assets
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    Records which inputs every output in the docs directory was built from.
+
+    `previous` holds the records loaded from the last build and `current`
+    collects the records of the build in progress, keyed by output path.
+    """
+
+    def __init__(self, previous=None):
+        self.previous = previous if previous is not None else {}
+        self.current = {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, "r") as file:
+                previous = json.load(file)
+        except (OSError, ValueError):
+            return cls()
+        return cls(previous.get("outputs", {}))
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"outputs": self.current}, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def explain(self, output_path, record, keys=None):
+        """
+        Records the inputs of output_path and returns the reasons it must be
+        rebuilt, or an empty list if it is up to date. When keys is given, only
+        those fields of the record are compared.
+
+        A record's "deps" field maps every input file the output was produced
+        from to its content hash, so each changed input is reported by name.
+        """
+        self.current[output_path] = record
+        previous = self.previous.get(output_path)
+        if previous is None:
+            return ["new output"]
+        if previous.get("failed"):
+            return ["previous build failed"]
+        if keys is None:
+            keys = sorted(set(previous) | set(record))
+        reasons = []
+        for key in keys:
+            old = previous.get(key)
+            new = record.get(key)
+            if old == new:
+                continue
+            if key == "deps" and isinstance(old, dict) and isinstance(new, dict):
+                for path in sorted(set(old) | set(new)):
+                    if path not in old:
+                        reasons.append(f"new dependency {path}")
+                    elif path not in new:
+                        reasons.append(f"no longer depends on {path}")
+                    elif old[path] != new[path]:
+                        reasons.append(f"{path} changed")
+            else:
+                reasons.append(f"{key} changed")
+        if not reasons and not os.path.exists(output_path):
+            reasons.append("output missing")
+        return reasons
+
+    def check(self, output_path, record, keys=None):
+        """
+        Records the inputs of output_path and returns True if it must be rebuilt.
+        When keys is given, only those fields of the record are compared.
+        """
+        return bool(self.explain(output_path, record, keys))
+
+    def stale_outputs(self):
+        return sorted(path for path in self.previous if path not in self.current)
+
+
+def remove_stale_outputs(manifest, docs_dir):
+    """
+    Deletes outputs whose sources were removed since the previous build,
+    along with any directories left empty inside docs_dir.
+    """
+    for path in manifest.stale_outputs():
+        if os.path.exists(path):
+            remove_output(path, docs_dir)
+
+
+def remove_untracked_outputs(manifest, docs_dir):
+    """
+    Deletes every file in docs_dir that is not an output of the current build,
+    along with any directories left empty. Used by full builds, which keep the
+    docs directory so that unchanged outputs are not rewritten.
+    """
+    for root, dirs, files in os.walk(docs_dir):
+        dirs.sort()
+        for file in sorted(files):
+            path = os.path.join(root, file)
+            if path not in manifest.current:
+                remove_output(path, docs_dir)
+
+
+def remove_output(path, docs_dir):
+    print(f"Removing stale output {path}")
+    os.remove(path)
+    docs_dir = os.path.abspath(docs_dir)
+    directory = os.path.dirname(os.path.abspath(path))
+    while directory != docs_dir and directory.startswith(docs_dir + os.sep):
+        if os.listdir(directory):
+            break
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
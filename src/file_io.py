@@ -0,0 +1,291 @@
+import locale
+import os
+import queue
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Directories this process has already created, so each one costs a single
+# makedirs call per build rather than one per page.
+_created_dirs = set()
+
+# Encoding open() uses for text files, which outputs have always been written in.
+ENCODING = locale.getpreferredencoding(False)
+
+# Temporary files are created private; outputs get the mode open() would give them.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def ensure_dir(path):
+    if path and path not in _created_dirs:
+        os.makedirs(path, exist_ok=True)
+        _created_dirs.add(path)
+
+
+class AtomicWriter:
+    """
+    Context manager that opens a temporary file next to path and renames it
+    over path on success, so readers never see a half-written file.
+    """
+
+    def __init__(self, path, mode="w"):
+        self.path = path
+        self.mode = mode
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        ensure_dir(directory)
+        try:
+            fd, self.tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=".", suffix=".tmp")
+        except FileNotFoundError:
+            # The directory was removed since this process created it.
+            _created_dirs.discard(directory)
+            ensure_dir(directory)
+            fd, self.tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=".", suffix=".tmp")
+        self.file = os.fdopen(fd, self.mode)
+        return self.file
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if exc_type is not None:
+            os.remove(self.tmp_path)
+            return False
+        os.chmod(self.tmp_path, 0o666 & ~_UMASK)
+        os.replace(self.tmp_path, self.path)
+        return False
+
+
+class ChangedFileWriter:
+    """
+    Context manager that writes an output chunk by chunk, comparing each chunk
+    with the same bytes of the file already at path. Only from the first chunk
+    that differs is the output written, atomically, to a temporary file that
+    starts with the bytes that matched. A file whose content is unchanged is
+    left untouched (mtime included). `changed` tells which happened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.matched = 0
+        self.writer = None
+        self.file = None
+        self.changed = None
+
+    def __enter__(self):
+        try:
+            self.existing = open(self.path, "rb")
+        except FileNotFoundError:
+            self.existing = None
+            self._diverge()
+        return self
+
+    def _diverge(self):
+        self.writer = AtomicWriter(self.path, "wb")
+        self.file = self.writer.__enter__()
+        if self.existing is not None:
+            self.existing.seek(0)
+            remaining = self.matched
+            while remaining:
+                data = self.existing.read(min(remaining, 1 << 16))
+                self.file.write(data)
+                remaining -= len(data)
+            self.existing.close()
+
+    def write(self, chunk):
+        data = chunk.encode(ENCODING)
+        if self.file is None:
+            if self.existing.read(len(data)) == data:
+                self.matched += len(data)
+                return
+            self._diverge()
+        self.file.write(data)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.file is None:
+            if self.existing.read(1) == b"":
+                self.existing.close()
+                self.changed = False
+                return False
+            # The existing file is longer.
+            self._diverge()
+        if self.file is None:
+            self.existing.close()
+            return False
+        self.changed = True
+        return self.writer.__exit__(exc_type, exc, tb)
+
+
+def write_if_changed(path, chunks):
+    """
+    Atomically writes the chunks to path unless the file already holds
+    exactly those bytes, in which case it is left untouched (mtime included).
+    Returns True if the file was written.
+    """
+    with ChangedFileWriter(path) as file:
+        for chunk in chunks:
+            file.write(chunk)
+    return file.changed
+
+
+def replay(chunks):
+    """
+    Returns a render function, as taken by write_output, that passes chunks
+    already rendered to its write function.
+    """
+
+    def render(write):
+        for chunk in chunks:
+            write(chunk)
+
+    return render
+
+
+class WriteStats:
+    """
+    Counts outputs that were written and outputs left untouched because their
+    content did not change.
+    """
+
+    __slots__ = ("changed", "unchanged")
+
+    def __init__(self):
+        self.changed = 0
+        self.unchanged = 0
+
+    def record(self, changed):
+        if changed:
+            self.changed += 1
+        else:
+            self.unchanged += 1
+
+    def merge(self, other):
+        self.changed += other.changed
+        self.unchanged += other.unchanged
+
+
+class InlineWriter:
+    """
+    Writer with the interface of WriteBehind that writes immediately, raising
+    any error to the caller.
+    """
+
+    def __init__(self, stats=None, postprocessor=None):
+        self.stats = stats if stats is not None else WriteStats()
+        self.postprocessor = postprocessor
+        self.errors = []
+
+    def write(self, path, render, key=None):
+        self.stats.record(write_output(path, render, self.postprocessor))
+
+
+def write_output(path, render, postprocessor=None):
+    """
+    Writes the output that render produces to path with a ChangedFileWriter.
+    render is a function that passes the chunks of the output to the write
+    function it is given, e.g. Template.stream, so the output is compared and
+    written as it is rendered. If a PostProcessor is given, an output it
+    minifies is rendered whole first, and its compressed siblings are
+    refreshed after.
+    """
+    if postprocessor is not None and postprocessor.transforms(path):
+        chunks = []
+        render(chunks.append)
+        render = replay(postprocessor.process(path, chunks))
+    with ChangedFileWriter(path) as file:
+        render(file.write)
+    if postprocessor is not None:
+        postprocessor.compress(path)
+    return file.changed
+
+
+class Prefetcher:
+    """
+    Reads files on a thread pool ahead of their consumer. Iterating yields a
+    future of each file's bytes, in order, with at most `ahead` reads in flight.
+    """
+
+    def __init__(self, paths, threads=4, ahead=16):
+        self.paths = paths
+        self.ahead = ahead
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def __iter__(self):
+        pending = deque()
+        paths = iter(self.paths)
+        while True:
+            while len(pending) < self.ahead:
+                path = next(paths, None)
+                if path is None:
+                    break
+                pending.append(self.executor.submit(read_bytes, path))
+            if not pending:
+                return
+            yield pending.popleft()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        return False
+
+
+def read_bytes(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+class WriteBehind:
+    """
+    Writes files on background threads through a bounded queue, so rendering
+    blocks only when `max_pending` writes are already waiting. Each output is
+    rendered into a list of chunks that waits in the queue, then written with
+    write_output and counted in `stats`. Failed writes are collected as
+    (key, error message) in `errors`.
+    """
+
+    def __init__(self, threads=2, max_pending=16, stats=None, postprocessor=None):
+        self.stats = stats if stats is not None else WriteStats()
+        self.postprocessor = postprocessor
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.errors = []
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def write(self, path, render, key=None):
+        chunks = []
+        render(chunks.append)
+        self.queue.put((path, chunks, key if key is not None else path))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            path, chunks, key = item
+            try:
+                changed = write_output(path, replay(chunks), self.postprocessor)
+            except Exception as e:
+                with self.lock:
+                    self.errors.append((key, f"{type(e).__name__}: {e}"))
+                continue
+            with self.lock:
+                self.stats.record(changed)
+
+    def close(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        return self.errors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    Test case with a temporary directory, self.dir, removed after each test.
+    Names given to its helpers are relative to it; absolute paths are used as is.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def write(self, name, content):
+        """
+        Writes content, text or bytes, to name, creating its directories.
+        Returns its path.
+        """
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+        return path
+
+    def read(self, name):
+        with open(self.path(name)) as file:
+            return file.read()
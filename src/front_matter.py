@@ -0,0 +1,142 @@
+import html
+import re
+from datetime import datetime, timezone
+
+from markdown_ast import MarkdownError
+
+FENCE = "---"
+FIELD_PATTERN = re.compile(r"([A-Za-z_][\w-]*):(?:\s+(.*))?$")
+LIST_ITEM_PATTERN = re.compile(r"\s+- (.*)$")
+SLUG_PATTERN = re.compile(r"[\w.-]+")
+TRUE_VALUES = ("true", "yes", "on")
+FALSE_VALUES = ("false", "no", "off")
+# Fields that choose how a page is built rather than fill template slots.
+BUILD_FIELDS = ("title", "draft", "template", "slug")
+# Slots the page itself fills, which no field may take.
+PAGE_SLOTS = ("Title", "Content")
+
+
+def parse_value(value):
+    """
+    Parses a scalar or a `[a, b]` flow list, removing quotes around strings.
+    """
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        return [parse_value(item) for item in value[1:-1].split(",") if item.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def normalize(fields, lines):
+    """
+    Gives the known fields their types: draft a bool, tags a list of strings,
+    date an ISO 8601 date or date and time, the others strings. lines holds
+    the line of every field, for errors.
+    """
+    if "draft" in fields:
+        draft = str(fields["draft"]).lower()
+        if draft not in TRUE_VALUES + FALSE_VALUES:
+            message = f"front matter draft must be true or false, not {fields['draft']!r}"
+            raise MarkdownError(message, lines["draft"], 1)
+        fields["draft"] = draft in TRUE_VALUES
+    if "tags" in fields:
+        tags = fields["tags"]
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        fields["tags"] = [tag.strip() for tag in tags if tag.strip()]
+    if "date" in fields:
+        try:
+            datetime.fromisoformat(fields["date"])
+        except (TypeError, ValueError):
+            message = f"front matter date is not an ISO 8601 date: {fields['date']!r}"
+            raise MarkdownError(message, lines["date"], 1) from None
+    for name in ("title", "template", "slug"):
+        if name in fields and not isinstance(fields[name], str):
+            raise MarkdownError(f"front matter {name} must be a string", lines[name], 1)
+    if "slug" in fields and (not SLUG_PATTERN.fullmatch(fields["slug"]) or fields["slug"] in (".", "..")):
+        raise MarkdownError(f"front matter slug is not a valid file name: {fields['slug']!r}", lines["slug"], 1)
+    return fields
+
+
+def read_front_matter(file):
+    """
+    Reads the front matter at the start of a markdown file object: `key:
+    value` lines between two `---` lines, where a value may also be a `[a, b]`
+    list or be followed by `  - item` lines. Reading stops at the closing
+    `---`, so the body of the file is never read.
+
+    Returns the fields, the lines read past the front matter that belong to
+    the body (the first line when there is no front matter) and the number of
+    lines the front matter took.
+    """
+    first = file.readline()
+    if first.rstrip("\r\n") != FENCE:
+        return {}, [first] if first else [], 0
+    fields = {}
+    lines = {}
+    # Field with an empty value, which the `- item` lines that follow fill.
+    list_key = None
+    number = 1
+    for line in iter(file.readline, ""):
+        number += 1
+        line = line.rstrip("\r\n")
+        if line == FENCE:
+            return normalize(fields, lines), [], number
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        item = LIST_ITEM_PATTERN.match(line)
+        if item is not None and list_key is not None:
+            if not isinstance(fields[list_key], list):
+                fields[list_key] = []
+            fields[list_key].append(parse_value(item.group(1)))
+            continue
+        match = FIELD_PATTERN.match(line)
+        if match is None:
+            raise MarkdownError(f"invalid front matter line: {line.strip()!r}", number, 1)
+        key = match.group(1).lower()
+        fields[key] = parse_value(match.group(2) or "")
+        lines[key] = number
+        list_key = key if fields[key] == "" else None
+    raise MarkdownError("front matter not closed", 1, 1)
+
+
+def read_front_matter_file(path):
+    """
+    Returns the front matter fields of the markdown file at path, reading
+    only its header.
+    """
+    with open(path, "r") as file:
+        try:
+            return read_front_matter(file)[0]
+        except MarkdownError as e:
+            e.path = path
+            raise
+
+
+def slot_values(fields):
+    """
+    Returns the template slot values of front matter fields, HTML-escaped:
+    `{{ Date }}` and `{{ Tags }}` (comma-separated), empty when the page has
+    none, and a slot named after every other field, e.g. `{{ Author }}`,
+    except the Title and Content slots of the page.
+    """
+    values = {"Date": "", "Tags": ""}
+    for key, value in fields.items():
+        if key in BUILD_FIELDS or key.capitalize() in PAGE_SLOTS:
+            continue
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        values[key.capitalize()] = html.escape(value)
+    return values
+
+
+def timestamp(date):
+    """
+    Returns an ISO 8601 front matter date as a UTC timestamp like
+    "2024-01-02T00:00:00Z", taking dates without a time zone to be in UTC.
+    """
+    parsed = datetime.fromisoformat(date)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
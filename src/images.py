@@ -0,0 +1,218 @@
+import filecmp
+import hashlib
+import os
+import re
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from build_manifest import hash_file
+from static_sync import place_file
+
+# Pillow is optional: without it images keep their size and only gain width,
+# height and lazy loading.
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+# Widths of the downscaled variants, smaller than the original, that are
+# offered to browsers in srcset alongside the original.
+VARIANT_WIDTHS = (480, 960, 1600)
+IMG_PATTERN = re.compile(r'<img src="([^"]*)"')
+
+
+def image_size(path):
+    """
+    Returns (width, height) read from the header of a PNG, GIF or JPEG file,
+    or None if the format is not recognised.
+    """
+    with open(path, "rb") as file:
+        header = file.read(26)
+        if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", header[6:10])
+        if header[:2] == b"\xff\xd8":
+            file.seek(2)
+            return jpeg_size(file)
+    return None
+
+
+def jpeg_size(file):
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            file.seek(-1, os.SEEK_CUR)
+            continue
+        length = file.read(2)
+        if len(length) < 2:
+            return None
+        # Start-of-frame markers, excluding DHT, JPG and DAC.
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">xHH", file.read(5))
+            return width, height
+        file.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def variant_name(path, width):
+    root, ext = os.path.splitext(path)
+    return f"{root}-{width}w{ext}"
+
+
+def make_variant(source, width, height, destination):
+    """
+    Writes source downscaled to width x height at destination. Runs in worker
+    processes, so only the paths and sizes are sent to it.
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destination), suffix=os.path.splitext(source)[1])
+    os.close(fd)
+    try:
+        with Image.open(source) as image:
+            image.resize((width, height), Image.LANCZOS).save(tmp_path)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return destination
+
+
+class ImageIndex:
+    """
+    Size and downscaled variants of every image of the site, keyed by URL
+    path, used to rewrite `<img>` tags with srcset, width, height and lazy
+    loading. `served` holds the fingerprinted URL of images that have one.
+    `digest` changes whenever the rewrite of any image would.
+    """
+
+    def __init__(self, basepath="/"):
+        self.basepath = basepath
+        self.images = {}
+        self.served = {}
+        self.digest = None
+
+    def add(self, url, width, height, variants=(), served=None):
+        """
+        Adds the image at url, served at served if it is fingerprinted, with
+        its (url, width) variants.
+        """
+        self.images[url] = (width, height, tuple(variants))
+        if served is not None and served != url:
+            self.served[url] = served
+
+    def finish(self):
+        digest = hashlib.sha256()
+        for url in sorted(self.images):
+            digest.update(repr((url, self.images[url])).encode())
+            if url in self.served:
+                digest.update(self.served[url].encode())
+        self.digest = digest.hexdigest()
+
+    def attributes(self, url):
+        width, height, variants = self.images[url]
+        prefix = self.basepath[:-1]
+        attributes = ""
+        if variants:
+            candidates = [f"{prefix}{variant} {variant_width}w" for variant, variant_width in variants]
+            candidates.append(f"{prefix}{self.served.get(url, url)} {width}w")
+            attributes += f' srcset="{", ".join(candidates)}" sizes="(max-width: {width}px) 100vw, {width}px"'
+        return f'{attributes} width="{width}" height="{height}" loading="lazy"'
+
+    def rewrite(self, html):
+        """
+        Adds srcset, width, height and loading="lazy" to the `<img>` tags in
+        html that refer to known images by their root-relative URL.
+        """
+        if "<img" not in html:
+            return html
+
+        def replace(match):
+            if match.group(1) not in self.images:
+                return match.group(0)
+            return match.group(0) + self.attributes(match.group(1))
+
+        return IMG_PATTERN.sub(replace, html)
+
+
+def process_images(static_dir, docs_dir, cache_dir, basepath="/", jobs=1, manifest=None, assets=None):
+    """
+    Indexes every image in static_dir and, when Pillow is available, places
+    downscaled variants next to its copy in docs_dir.
+
+    Variants are cached in cache_dir by the hash of the source image and
+    width, so each one is computed once and reused across builds. Missing
+    variants are computed on up to jobs worker processes. With an AssetMap,
+    variants are named after the fingerprinted image and the hash it holds for
+    the image is reused. With a manifest, so is the hash recorded with the
+    variants of the previous build for an image whose size and mtime are
+    unchanged, so only new and modified images are read. Returns an ImageIndex.
+    """
+    previous = {}
+    if manifest is not None:
+        for record in manifest.previous.values():
+            if "image" in record and "source_hash" in record:
+                previous[record["image"]] = record
+    index = ImageIndex(basepath)
+    tasks = []
+    placements = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            source = os.path.join(root, file)
+            size = image_size(source)
+            if size is None:
+                continue
+            width, height = size
+            relative_path = os.path.relpath(source, static_dir)
+            url = "/" + relative_path.replace(os.sep, "/")
+            served = assets.urls.get(url, url) if assets is not None else url
+            if served != url:
+                relative_path = served[1:].replace("/", os.sep)
+            variants = []
+            widths = [w for w in VARIANT_WIDTHS if w < width] if Image is not None else []
+            if widths:
+                stat = os.stat(source)
+                record = previous.get(source, {})
+                if assets is not None and source in assets.sources:
+                    source_hash = assets.sources[source][1]
+                elif record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns:
+                    source_hash = record["source_hash"]
+                else:
+                    source_hash = hash_file(source)
+                image = {"image": source, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "source_hash": source_hash}
+            for variant_width in widths:
+                variant_height = max(1, round(height * variant_width / width))
+                cached = os.path.join(
+                    cache_dir, source_hash[:2], f"{source_hash}-{variant_width}w{os.path.splitext(file)[1]}"
+                )
+                if not os.path.exists(cached):
+                    tasks.append((source, variant_width, variant_height, cached))
+                destination = os.path.join(docs_dir, variant_name(relative_path, variant_width))
+                placements.append((cached, destination, image))
+                variants.append((variant_name(served, variant_width), variant_width))
+            index.add(url, width, height, variants, served)
+    if Image is None:
+        print("Pillow is not installed, images are not resized")
+    if tasks:
+        print(f"Resizing {len(tasks)} image variant(s)")
+        if jobs <= 1 or len(tasks) == 1:
+            for task in tasks:
+                make_variant(*task)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                list(executor.map(make_variant, *zip(*tasks)))
+    for cached, destination, image in placements:
+        fresh = manifest is not None and not manifest.check(destination, {"source": cached, **image}, ("source",))
+        if fresh or (os.path.exists(destination) and filecmp.cmp(cached, destination, shallow=False)):
+            continue
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        place_file(cached, destination)
+    index.finish()
+    return index
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+
+class InlineCache:
+    """
+    Bounded LRU cache of inline markdown text -> rendered HTML fragment.
+
+    The cache is limited to max_entries entries and, if max_bytes is set, to
+    roughly that many characters of cached text and HTML.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        html = self.entries.get(text)
+        if html is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(text)
+        return html
+
+    def put(self, text, html):
+        size = len(text) + len(html)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        old = self.entries.pop(text, None)
+        if old is not None:
+            self.bytes -= len(text) + len(old)
+        self.entries[text] = html
+        self.bytes += size
+        while len(self.entries) > self.max_entries or (
+            self.max_bytes is not None and self.bytes > self.max_bytes
+        ):
+            old_text, old_html = self.entries.popitem(last=False)
+            self.bytes -= len(old_text) + len(old_html)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,9 +1,108 @@
 import re
 
+from markdown_ast import MarkdownError
 from textnode import TextNode, TextType
 
 
-def text_to_textnodes(text):
+INLINE_TOKEN_PATTERN = re.compile(r"\*\*|[_`]|!?\[")
+DELIMITER_PATTERN = re.compile(r"\*\*|[_`]")
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+
+def text_to_textnodes(text, legacy=False, source_map=None):
+    if legacy:
+        return text_to_textnodes_legacy(text)
+    return tokenize_inline(text, source_map)
+
+
+def tokenize_inline(text, source_map=None):
+    """
+    Splits text into TextNodes in a single left-to-right scan.
+
+    The output matches the split pipeline of text_to_textnodes_legacy: `**`
+    takes precedence over `_`, which takes precedence over backticks, so a
+    delimiter that would cut through a section of lower precedence is an error.
+    Links and images are only recognised in plain text and never span a delimiter.
+
+    source_map is the SourceMap of text, if known. Nodes then carry their
+    offset and the map, and errors their line and column.
+    """
+    nodes = []
+    text_start = 0
+    pos = 0
+    while True:
+        match = INLINE_TOKEN_PATTERN.search(text, pos)
+        if match is None:
+            break
+        token = match.group()
+        start = match.start()
+        if token == "**":
+            end = text.find("**", start + 2)
+            if end == -1:
+                raise _unclosed(source_map, start)
+            node = TextNode(text[start + 2 : end], TextType.BOLD, None, start, source_map)
+            pos = end + 2
+        elif token == "_":
+            end = text.find("_", start + 1)
+            if end == -1 or text.find("**", start + 1, end) != -1:
+                raise _unclosed(source_map, start)
+            node = TextNode(text[start + 1 : end], TextType.ITALIC, None, start, source_map)
+            pos = end + 1
+        elif token == "`":
+            end = text.find("`", start + 1)
+            if end == -1 or DELIMITER_PATTERN.search(text, start + 1, end):
+                raise _unclosed(source_map, start)
+            node = TextNode(text[start + 1 : end], TextType.CODE, None, start, source_map)
+            pos = end + 1
+        else:
+            if token == "![":
+                found = IMAGE_PATTERN.match(text, start)
+            elif start == 0 or text[start - 1] != "!":
+                found = LINK_PATTERN.match(text, start)
+            else:
+                found = None
+            if (
+                found is None
+                or DELIMITER_PATTERN.search(text, start, found.end())
+                or (token == "[" and _image_within(text, start + 1, found.end()))
+            ):
+                pos = start + 1
+                continue
+            if token == "![":
+                node = TextNode(found.group(1), TextType.IMAGE, found.group(2), start, source_map)
+            else:
+                node = TextNode(found.group(1), TextType.LINK, found.group(2), start, source_map)
+            pos = found.end()
+        if start > text_start:
+            nodes.append(TextNode(text[text_start:start], TextType.TEXT, None, text_start, source_map))
+        if node.text != "" or node.text_type in (TextType.IMAGE, TextType.LINK):
+            nodes.append(node)
+        text_start = pos
+    if text_start < len(text):
+        nodes.append(TextNode(text[text_start:], TextType.TEXT, None, text_start, source_map))
+    return nodes
+
+
+def _unclosed(source_map, offset):
+    if source_map is None:
+        return MarkdownError("invalid markdown, formatted section not closed")
+    return MarkdownError("invalid markdown, formatted section not closed", *source_map.position(offset))
+
+
+def _image_within(text, start, end):
+    # Images are split out before links, so an image starting inside a link
+    # candidate wins over the link.
+    start = text.find("![", start, end)
+    while start != -1:
+        found = IMAGE_PATTERN.match(text, start)
+        if found and not DELIMITER_PATTERN.search(text, start, found.end()):
+            return True
+        start = text.find("![", start + 1, end)
+    return False
+
+
+def text_to_textnodes_legacy(text):
     nodes = [TextNode(text, TextType.TEXT)]
     nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
     nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
@@ -0,0 +1,130 @@
+import os
+import posixpath
+import re
+from urllib.parse import unquote
+
+LINK_PATTERN = re.compile(r'\b(?:href|src)="([^"]*)"')
+ID_PATTERN = re.compile(r'\bid="([^"]*)"')
+SCHEME_PATTERN = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+
+
+def extract_links(html):
+    """
+    Returns the distinct href and src values of an HTML fragment, in order.
+    """
+    return list(dict.fromkeys(LINK_PATTERN.findall(html)))
+
+
+def extract_anchors(html):
+    return list(dict.fromkeys(ID_PATTERN.findall(html)))
+
+
+def source_line(text, url):
+    """
+    Returns the 1-based line of text that url first appears on, or None.
+    """
+    index = text.find(url)
+    if index == -1:
+        return None
+    return text.count("\n", 0, index) + 1
+
+
+def is_internal(url):
+    return not (SCHEME_PATTERN.match(url) or url.startswith("//"))
+
+
+class LinkIndex:
+    """
+    Set of every URL path and anchor of a built site, so each internal link
+    can be checked with a dictionary lookup instead of a crawl of docs_dir.
+
+    Paths are root-relative and exclude the basepath, like the links in the
+    rendered markdown. A directory's index.html is also reachable as the
+    directory, with or without a trailing slash.
+    """
+
+    def __init__(self, docs_dir, outputs=()):
+        self.docs_dir = docs_dir
+        self.paths = {}
+        self.anchors = set()
+        for output in outputs:
+            self.add_output(output)
+
+    def url_path(self, output):
+        return "/" + os.path.relpath(output, self.docs_dir).replace(os.sep, "/")
+
+    def add_output(self, output):
+        path = self.url_path(output)
+        self.paths[path] = path
+        if path.endswith("/index.html"):
+            directory = path[: -len("index.html")]
+            self.paths[directory] = path
+            if directory != "/":
+                self.paths[directory.rstrip("/")] = path
+
+    def add_anchors(self, output, anchors):
+        path = self.url_path(output)
+        for anchor in anchors:
+            self.anchors.add((path, anchor))
+
+    def resolve(self, url, page_path):
+        """
+        Returns the URL path and fragment that url refers to from the page at
+        page_path.
+        """
+        url, _, fragment = url.partition("#")
+        url = url.partition("?")[0]
+        if not url:
+            return page_path, fragment
+        path = unquote(url)
+        if not path.startswith("/"):
+            path = posixpath.join(posixpath.dirname(page_path), path)
+        trailing = path.endswith("/")
+        path = posixpath.normpath(path)
+        if trailing and path != "/":
+            path += "/"
+        return path, fragment
+
+    def check(self, url, page_path):
+        """
+        Returns True if url, linked from the page at page_path, points to an
+        output of the build and, if it has a fragment, to an anchor in it.
+        External URLs are not checked.
+        """
+        if not is_internal(url):
+            return True
+        path, fragment = self.resolve(url, page_path)
+        target = self.paths.get(path)
+        if target is None:
+            return False
+        return not fragment or (target, fragment) in self.anchors
+
+
+def check_site_links(outputs, docs_dir, metadata, templates=(), assets=None):
+    """
+    Checks the links of every page in metadata, a dict of output path ->
+    page_metadata, and of the templates against the outputs of the build.
+    Links are checked as written, so with an AssetMap an asset is also
+    reachable by the URL it is referenced by.
+    Returns the broken links as (file, line, url), with line None if unknown.
+    """
+    index = LinkIndex(docs_dir, outputs)
+    if assets is not None:
+        for url, served in assets.urls.items():
+            if served in index.paths:
+                index.paths[url] = index.paths[served]
+    for output, meta in metadata.items():
+        index.add_anchors(output, meta["anchors"])
+    broken = []
+    for output, meta in sorted(metadata.items()):
+        page_path = index.url_path(output)
+        for url, line in meta["links"]:
+            if not index.check(url, page_path):
+                broken.append((meta["source"], line, url))
+    # Relative template links resolve differently on every page, so only
+    # root-relative ones are checked.
+    for template in templates:
+        for url in extract_links(template.text):
+            if url.startswith("/") and not index.check(url, "/"):
+                broken.append((template.path, source_line(template.text, url), url))
+    return broken
@@ -1,32 +1,105 @@
 from textnode import TextNode, TextType
+import argparse
+import cProfile
 import os
-import shutil
-from page_generator import generate_page
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from assets import fingerprint_assets
+from build_manifest import BuildManifest, hash_file, remove_stale_outputs, remove_untracked_outputs
+from file_io import WriteStats
+from static_sync import CHECK_MODES, LINK_MODES, sync_static
+from images import process_images
+from inline_cache import InlineCache
+from markdown_blocks import set_inline_cache
+from page_generator import PipelineLimits, batch_pages, generate_batch, generate_pages
+from postprocess import PostProcessor
+from profiler import NULL_PROFILER, BuildProfiler
+from render_cache import GENERATOR_VERSION, RenderCache
+from link_check import check_site_links
+from front_matter import read_front_matter_file
+from markdown_ast import MarkdownError
+from site_index import METADATA_FIELDS, has_fields, write_site_artifacts
+from template import Template
 import sys
 
-def copy_static(source, destination):
+
+# Fields of a page's manifest record that decide whether it must be rebuilt.
+PAGE_KEYS = ("source", "generator", "deps", "basepath", "images", "minify", "assets")
+
+
+class BuildError(Exception):
+    def __init__(self, failures, stats=None):
+        self.failures = failures
+        self.stats = stats
+        lines = [f"{len(failures)} page(s) failed to build:"]
+        for path, error in failures:
+            # Markdown errors already start with their file and position.
+            if error.startswith(f"{path}:"):
+                lines.append(f"  {error}")
+            else:
+                lines.append(f"  {path}: {error}")
+        super().__init__("\n".join(lines))
+
+
+def copy_static(
+    source, destination, manifest=None, link="copy", check="mtime", postprocessor=None, assets=None
+):
     """
     Recursively copies files and directories from the source to the destination.
 
     Args:
         source (str): The source directory path.
         destination (str): The destination directory path.
+        manifest (BuildManifest, optional): When given, files unchanged since
+            the previous build are not copied again.
+        link (str): "copy", "hardlink" or "reflink" for how files are placed.
+        check (str): "mtime" to detect changes by size and mtime, "hash" by content.
+        postprocessor (PostProcessor, optional): Minifies stylesheets and
+            precompresses the copied files.
+        assets (AssetMap, optional): Copies assets under their fingerprinted names.
+    """
+    copied, skipped = sync_static(source, destination, manifest, link, check, postprocessor, assets)
+    if skipped:
+        print(f"Copied {copied} static file(s), {skipped} unchanged")
+
+def output_path(file_path, content_dir, docs_dir, slug=None):
     """
-    items = os.listdir(source)
-    for item in items:
-        source_path = os.path.join(source, item)
-        destination_path = os.path.join(destination, item)
-        if os.path.isfile(source_path):
-            # Copy file from source to destination
-            print(f"Copying {source_path} to {destination_path}")
-            shutil.copy(source_path, destination_path)
-        else:
-            # Create directory in destination and copy contents recursively
-            print(f"Creating directory {destination_path}")
-            os.mkdir(destination_path)
-            copy_static(source_path, destination_path)
-
-def generate_site_pages(content_dir, template_path, docs_dir, basepath):
+    Maps a Markdown file in the content directory to the HTML file it is built into.
+    A slug from the page's front matter replaces the name of the file, or of
+    the directory of an index.md other than the site's home page.
+    """
+    relative_path = os.path.relpath(file_path, content_dir)
+    if os.path.basename(file_path) == "index.md":
+        directory = os.path.dirname(relative_path)
+        if slug and directory:
+            directory = os.path.join(os.path.dirname(directory), slug)
+        return os.path.join(docs_dir, directory, "index.html")
+    if slug:
+        relative_path = os.path.join(os.path.dirname(relative_path), slug + ".md")
+    return os.path.join(docs_dir, relative_path.replace(".md", ".html"))
+
+def generate_site_pages(
+    content_dir,
+    template_path,
+    docs_dir,
+    basepath,
+    *,
+    manifest=None,
+    jobs=1,
+    profiler=None,
+    inline_cache=None,
+    render_cache=None,
+    explain=False,
+    io_threads=0,
+    metadata=None,
+    images=None,
+    postprocessor=None,
+    assets=None,
+    fields=METADATA_FIELDS,
+    memory_budget=None,
+    drafts=False,
+    templates=None,
+):
     """
     Generates HTML pages for all Markdown files in the content directory.
 
@@ -35,43 +108,509 @@ def generate_site_pages(content_dir, template_path, docs_dir, basepath):
         template_path (str): The path to the template file.
         docs_dir (str): The directory to save the generated HTML files.
         basepath (str): The base path for URLs in the generated HTML.
+        manifest (BuildManifest, optional): When given, pages whose markdown,
+            template, partials and basepath are unchanged since the previous
+            build, by the same GENERATOR_VERSION, are skipped.
+        jobs (int): The number of worker processes used to render pages.
+        profiler (BuildProfiler, optional): Collects per-stage and per-page timings.
+        inline_cache (InlineCache, optional): Caches rendered inline text across
+            pages. Each worker process gets its own copy; the hit and miss counts
+            of all workers are added into this one.
+        render_cache (RenderCache, optional): On-disk cache of rendered articles
+            reused across builds.
+        explain (bool): Print why each page is rebuilt.
+        io_threads (int): Threads per process used to prefetch sources and
+            write outputs behind the renderer. 0 reads and writes inline.
+        metadata (dict, optional): Filled with the page_metadata of every page
+            by output path. Pages skipped by an incremental build reuse the
+            metadata stored in the manifest.
+        images (ImageIndex, optional): Rewrites `<img>` tags with the sizes
+            and responsive variants of the images.
+        postprocessor (PostProcessor, optional): Minifies the pages and writes
+            their precompressed siblings.
+        assets (AssetMap, optional): Points references to assets at their
+            fingerprinted names.
+        fields (tuple): The optional METADATA_FIELDS groups to collect in metadata.
+        memory_budget (int, optional): Bytes of memory the build should fit
+            in. Bounds the worker processes and the pages queued in each of
+            them; pages otherwise flow through with at most two batches per
+            worker in flight.
+        drafts (bool): Also build pages marked as drafts in their front matter.
+        templates (list, optional): Filled with every Template the pages use,
+            the default one first.
+
+    Pages are found by reading only the front matter of every Markdown file,
+    which decides whether it is a draft, its output path (slug) and its
+    template, a file relative to the directory of template_path.
+
+    Returns:
+        WriteStats: How many outputs were written and how many were left
+            untouched because their content was unchanged.
+
+    Raises:
+        BuildError: If any page failed to build. The other pages are still
+            generated, and failed pages keep their previous output. Their
+            manifest records are marked as failed so the next build retries them.
     """
-    for root, _, files in os.walk(content_dir):
-        for file in files:
+    compiled = {None: Template.from_file(template_path, basepath, images, assets)}
+    if templates is not None:
+        templates.append(compiled[None])
+    template_deps = {}
+
+    def page_template(name):
+        if name not in compiled:
+            path = os.path.join(os.path.dirname(template_path), name)
+            compiled[name] = Template.from_file(path, basepath, images, assets)
+            if templates is not None:
+                templates.append(compiled[name])
+        if manifest is not None and name not in template_deps:
+            template_deps[name] = {path: hash_file(path) for path in compiled[name].dependencies}
+        return compiled[name]
+
+    pages = []
+    # Pages by template, in the order the templates are first used.
+    groups = {}
+    # Output of every page, including those that failed before rendering.
+    outputs = {}
+    sources = {}
+    failures = []
+    for root, dirs, files in os.walk(content_dir):
+        dirs.sort()
+        for file in sorted(files):
             if file.endswith(".md"):
                 file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, content_dir)
-                if file == "index.md":
-                    html_path = os.path.join(docs_dir, os.path.dirname(relative_path), "index.html")
-                else:
-                    html_path = os.path.join(docs_dir, relative_path.replace(".md", ".html"))
-                generate_page(file_path, template_path, html_path, basepath)
+                try:
+                    front = read_front_matter_file(file_path)
+                except MarkdownError as e:
+                    outputs[file_path] = output_path(file_path, content_dir, docs_dir)
+                    failures.append((file_path, str(e)))
+                    continue
+                if front.get("draft") and not drafts:
+                    print(f"Skipping draft {file_path}")
+                    continue
+                html_path = output_path(file_path, content_dir, docs_dir, front.get("slug"))
+                if html_path in sources:
+                    failures.append((file_path, f"{html_path} is also built from {sources[html_path]}"))
+                    continue
+                outputs[file_path] = html_path
+                sources[html_path] = file_path
+                try:
+                    template = page_template(front.get("template"))
+                except (OSError, ValueError) as e:
+                    failures.append((file_path, f"template {front['template']}: {type(e).__name__}: {e}"))
+                    continue
+                if manifest is not None:
+                    record = {
+                        "source": file_path,
+                        "generator": GENERATOR_VERSION,
+                        "deps": {file_path: hash_file(file_path), **template_deps[front.get("template")]},
+                        "basepath": basepath,
+                    }
+                    if images is not None:
+                        record["images"] = images.digest
+                    if postprocessor is not None and postprocessor.minify:
+                        record["minify"] = True
+                    if assets is not None:
+                        record["assets"] = assets.digest
+                    reasons = manifest.explain(html_path, record, PAGE_KEYS)
+                    if metadata is not None and not reasons:
+                        previous_meta = manifest.previous[html_path].get("meta")
+                        if not has_fields(previous_meta, fields):
+                            reasons.append("metadata missing")
+                        else:
+                            record["meta"] = metadata[html_path] = previous_meta
+                    if not reasons:
+                        continue
+                    if explain:
+                        print(f"Rebuilding {html_path}: {', '.join(reasons)}")
+                pages.append((file_path, html_path))
+                groups.setdefault(template, []).append((file_path, html_path))
 
+    if memory_budget is not None and pages:
+        sizes = [os.path.getsize(from_path) for from_path, _ in pages]
+        limits = PipelineLimits.from_budget(memory_budget, jobs, max(sizes), sum(sizes) // len(sizes))
+        print(
+            f"Memory budget {memory_budget // (1024 * 1024)} MB: {limits.jobs} process(es), "
+            f"{limits.depth} page(s) queued per stage"
+        )
+    else:
+        limits = PipelineLimits(jobs)
 
+    stats = WriteStats()
+    rendered = {} if metadata is not None else None
 
-def main():
+    def collect(batch, future):
+        try:
+            batch_failures, batch_profiler, cache_counts, batch_stats, batch_metadata = future.result()
+        except Exception as e:
+            # The worker died, e.g. killed for running out of memory.
+            failures.extend((from_path, f"{type(e).__name__}: {e}") for from_path, _ in batch)
+            return
+        failures.extend(batch_failures)
+        stats.merge(batch_stats)
+        if rendered is not None:
+            rendered.update(batch_metadata)
+        if profiler is not None:
+            profiler.merge(batch_profiler)
+        if inline_cache is not None:
+            inline_cache.hits += cache_counts[0]
+            inline_cache.misses += cache_counts[1]
+
+    if limits.jobs <= 1 or len(pages) <= 1:
+        set_inline_cache(inline_cache)
+        try:
+            for template, group in groups.items():
+                failures += generate_pages(
+                    group,
+                    template,
+                    profiler or NULL_PROFILER,
+                    render_cache,
+                    io_threads,
+                    stats,
+                    rendered,
+                    postprocessor,
+                    fields,
+                    limits.depth,
+                )
+        finally:
+            set_inline_cache(None)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=limits.jobs, initializer=set_inline_cache, initargs=(inline_cache,)
+        ) as executor:
+            # Batches are submitted as earlier ones are collected, so results
+            # never pile up ahead of the main process.
+            in_flight = deque()
+            for template, group in groups.items():
+                for batch in batch_pages(group):
+                    if len(in_flight) >= limits.in_flight:
+                        collect(*in_flight.popleft())
+                    future = executor.submit(
+                        generate_batch,
+                        batch,
+                        template,
+                        profile=profiler is not None,
+                        render_cache=render_cache,
+                        io_threads=io_threads,
+                        collect=fields if metadata is not None else None,
+                        postprocessor=postprocessor,
+                        depth=limits.depth,
+                    )
+                    in_flight.append((batch, future))
+            while in_flight:
+                collect(*in_flight.popleft())
+    if rendered is not None:
+        metadata.update(rendered)
+        if manifest is not None:
+            for html_path, meta in rendered.items():
+                manifest.current[html_path]["meta"] = meta
+    if failures:
+        for from_path, _ in failures:
+            html_path = outputs.get(from_path)
+            if html_path is None:
+                # Its output is the page it collides with.
+                continue
+            if metadata is not None:
+                metadata.pop(html_path, None)
+            if manifest is None:
+                continue
+            record = {"source": from_path, "failed": True}
+            previous_meta = manifest.previous.get(html_path, {}).get("meta")
+            if metadata is not None and has_fields(previous_meta, fields) and os.path.exists(html_path):
+                record["meta"] = metadata[html_path] = previous_meta
+            manifest.current[html_path] = record
+        raise BuildError(failures, stats)
+    return stats
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site into the docs directory.")
+    parser.add_argument("basepath", nargs="?", default="/", help="base path for URLs in the generated HTML")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild outputs whose inputs changed since the previous build",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=".build_manifest.json",
+        help="path of the build manifest used by incremental builds",
+    )
+    parser.add_argument(
+        "--keep-going",
+        "-k",
+        action="store_true",
+        help="finish the build when pages fail, keeping their previous output, then exit with an error",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also build pages marked as drafts in their front matter",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="print which changed inputs caused each page to be rebuilt",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes used to render pages (default: CPU count)",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        metavar="MB",
+        help="fit the build in about MB megabytes by limiting worker processes and queued pages",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=4,
+        help="threads per process that prefetch sources and write outputs (0: inline I/O)",
+    )
+    parser.add_argument(
+        "--static-link",
+        choices=LINK_MODES,
+        default="copy",
+        help="how static files are placed in the docs directory",
+    )
+    parser.add_argument(
+        "--static-check",
+        choices=CHECK_MODES,
+        default="mtime",
+        help="how unchanged static files are detected in incremental builds",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="add sizes, lazy loading and (with Pillow) downscaled srcset variants to images",
+    )
+    parser.add_argument(
+        "--image-cache",
+        default=".image_cache",
+        metavar="DIR",
+        help="directory where downscaled image variants are kept between builds",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="copy stylesheets, scripts and images under names containing their content hash, for long-lived caching",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="strip insignificant whitespace from HTML pages and comments and whitespace from stylesheets",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write .gz (and, with brotli, .br) copies of text outputs next to them for the web server",
+    )
+    parser.add_argument(
+        "--inline-cache",
+        type=int,
+        default=0,
+        metavar="ENTRIES",
+        help="cache up to ENTRIES rendered inline spans shared across pages (default: off)",
+    )
+    parser.add_argument(
+        "--inline-cache-bytes",
+        type=int,
+        metavar="BYTES",
+        help="also limit the inline cache to about BYTES of text and HTML",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="directory of a render cache shared between builds (default: off)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=512,
+        metavar="MB",
+        help="size limit of the render cache in megabytes (default: 512)",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="absolute URL of the site root; also writes sitemap.xml and an Atom feed of the blog",
+    )
+    parser.add_argument(
+        "--site-author",
+        metavar="NAME",
+        help="author of the Atom feed (default: the title of the home page)",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="also write search.json, a compact index for client-side search",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report internal links and images that point to no output or anchor, and fail the build",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print wall time per pipeline stage and the slowest pages",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        help="also write cProfile stats of the build to FILE (implies --profile and --jobs 1)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Main function to set up the static site generator.
-    It clears the docs directory if it exists and copies the static files to the docs directory.
+    It copies the static files to the docs directory and renders every page,
+    leaving outputs whose content is unchanged untouched and deleting any other
+    file in the docs directory. With --incremental only outputs whose inputs
+    changed since the previous build are rebuilt, and only outputs of removed
+    sources are deleted. With --keep-going a build with failed pages is
+    completed around them before exiting with an error.
     """
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    basepath = args.basepath
     static_dir = "static"
     docs_dir = "docs"
-    
-    # Remove the docs directory if it exists
-    if os.path.exists(docs_dir):
-        shutil.rmtree(docs_dir)
-    
-    # Create a new docs directory
-    os.mkdir(docs_dir)
+
+    if args.incremental:
+        manifest = BuildManifest.load(args.manifest)
+    else:
+        # Without a previous build to compare with, every output is compared
+        # with the file already in the docs directory instead.
+        manifest = BuildManifest()
+
+    os.makedirs(docs_dir, exist_ok=True)
+
+    jobs = args.jobs
+    inline_cache = None
+    if args.inline_cache > 0:
+        inline_cache = InlineCache(args.inline_cache, args.inline_cache_bytes)
+    render_cache = None
+    if args.cache_dir:
+        render_cache = RenderCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    profiler = None
+    cprofile = None
+    if args.profile or args.profile_output:
+        profiler = BuildProfiler()
+    if args.profile_output:
+        # cProfile only sees this process, so render the pages here too.
+        jobs = 1
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+
+    postprocessor = None
+    if args.minify or args.precompress:
+        postprocessor = PostProcessor(args.minify, args.precompress)
+
+    metadata = None
+    if args.site_url or args.search_index or args.check_links:
+        metadata = {}
+    # Only what the enabled site-wide outputs need is kept for every page.
+    fields = tuple(
+        field for field, enabled in (("links", args.check_links), ("terms", args.search_index)) if enabled
+    )
+    memory_budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+
+    assets = None
+    if args.fingerprint:
+        with (profiler or NULL_PROFILER).stage("fingerprint"):
+            assets = fingerprint_assets(static_dir, manifest)
 
     # Copy static files to the docs directory
-    copy_static(static_dir, docs_dir)
-    generate_site_pages("content", "template.html", docs_dir, basepath)
-    
+    with (profiler or NULL_PROFILER).stage("copy_static"):
+        copy_static(static_dir, docs_dir, manifest, args.static_link, args.static_check, postprocessor, assets)
+    images = None
+    if args.images:
+        with (profiler or NULL_PROFILER).stage("images"):
+            images = process_images(
+                static_dir, docs_dir, args.image_cache, basepath, jobs, manifest, assets
+            )
+    failure = None
+    templates = []
+    try:
+        stats = generate_site_pages(
+            "content",
+            "template.html",
+            docs_dir,
+            basepath,
+            manifest=manifest,
+            jobs=jobs,
+            profiler=profiler,
+            inline_cache=inline_cache,
+            render_cache=render_cache,
+            explain=args.explain,
+            io_threads=args.io_threads,
+            metadata=metadata,
+            images=images,
+            postprocessor=postprocessor,
+            assets=assets,
+            fields=fields,
+            memory_budget=memory_budget,
+            drafts=args.drafts,
+            templates=templates,
+        )
+    except BuildError as e:
+        if not args.keep_going:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        failure = e
+        stats = e.stats
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(args.profile_output)
+        if profiler is not None:
+            print(profiler.report())
+        if inline_cache is not None:
+            cache_stats = inline_cache.stats()
+            print(
+                f"Inline cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                f"({cache_stats['hit_rate']:.1%})"
+            )
+    print(f"Wrote {stats.changed} page(s), {stats.unchanged} unchanged")
+    if metadata is not None:
+        write_site_artifacts(
+            metadata, docs_dir, basepath, "content", args.site_url, args.search_index, manifest, args.site_author
+        )
+    if postprocessor is not None and postprocessor.precompress:
+        # Pages and static files were compressed as they were written; this
+        # catches the remaining outputs (artifacts, image variants) and any
+        # sibling removed since, and checks the others by mtime only.
+        with (profiler or NULL_PROFILER).stage("precompress"):
+            compressed = sum(postprocessor.compress(path) for path in manifest.current if os.path.exists(path))
+        if compressed:
+            print(f"Compressed {compressed} file(s)")
+        postprocessor.register(manifest)
+    if args.incremental:
+        remove_stale_outputs(manifest, docs_dir)
+    else:
+        remove_untracked_outputs(manifest, docs_dir)
+    if render_cache is not None:
+        entries, size = render_cache.evict()
+        print(f"Render cache: {entries} entries, {size / 1024 / 1024:.1f} MB")
+    manifest.save(args.manifest)
+    broken = []
+    if args.check_links:
+        broken = check_site_links(manifest.current, docs_dir, metadata, templates, assets)
+        for path, line, url in broken:
+            print(f"{path}:{line or '?'}: broken link {url}", file=sys.stderr)
+        if broken:
+            print(f"{len(broken)} broken link(s)", file=sys.stderr)
+    if failure is not None:
+        print(failure, file=sys.stderr)
+    if broken or failure is not None:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     # Entry point of the script
     main()
-
-
@@ -0,0 +1,97 @@
+from bisect import bisect_right
+
+
+class MarkdownError(ValueError):
+    """
+    A markdown syntax error at a 1-based line and column of the source, and
+    in the file at path once the caller knows it.
+    """
+
+    def __init__(self, message, line=None, column=None, path=None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+        self.column = column
+        self.path = path
+
+    def __str__(self):
+        location = ":".join(str(part) for part in (self.path, self.line, self.column) if part is not None)
+        if not location:
+            return self.message
+        return f"{location}: {self.message}"
+
+
+class SourceMap:
+    """
+    Maps offsets in the inline text of a block back to (line, column) in the
+    markdown source. The inline text is made of segments, each copied from a
+    single source line, and only the start of every segment is stored.
+    """
+
+    __slots__ = ("offsets", "lines", "columns")
+
+    def __init__(self):
+        self.offsets = []
+        self.lines = []
+        self.columns = []
+
+    @classmethod
+    def from_lines(cls, text, line, column):
+        """
+        Maps text that starts at line and column and continues at the start
+        of the following lines after every newline (or its replacement).
+        """
+        source_map = cls()
+        source_map.add(0, line, column)
+        start = text.find("\n")
+        while start != -1:
+            line += 1
+            source_map.add(start + 1, line, 1)
+            start = text.find("\n", start + 1)
+        return source_map
+
+    def add(self, offset, line, column):
+        self.offsets.append(offset)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def position(self, offset):
+        i = bisect_right(self.offsets, offset) - 1
+        return self.lines[i], self.columns[i] + offset - self.offsets[i]
+
+
+class BlockNode:
+    """
+    A block of the markdown parse tree, starting at a 1-based line and column.
+
+    Paragraphs, headings, quotes and list items hold their inline markdown in
+    `text`, with a SourceMap locating it in the source; it is tokenized when
+    the block is rendered. Code blocks hold their raw text, headings their
+    `level`, and lists their items in `children`.
+    """
+
+    __slots__ = ("block_type", "line", "column", "text", "source_map", "level", "children")
+
+    def __init__(self, block_type, line, column, text=None, source_map=None, level=None, children=None):
+        self.block_type = block_type
+        self.line = line
+        self.column = column
+        self.text = text
+        self.source_map = source_map
+        self.level = level
+        self.children = children
+
+    def __repr__(self):
+        return f"BlockNode({self.block_type.value}, {self.line}:{self.column}, {self.text!r}, {self.children})"
+
+
+class Document:
+    """
+    Root of the parse tree: the blocks of a markdown file and its title.
+    """
+
+    __slots__ = ("children", "title")
+
+    def __init__(self, children, title=None):
+        self.children = children
+        self.title = title
@@ -1,8 +1,10 @@
+import io
 from enum import Enum
 
-from htmlnode import ParentNode
+from htmlnode import LeafNode, ParentNode
 from inline_markdown import text_to_textnodes
-from textnode import text_node_to_html_node, TextNode, TextType
+from markdown_ast import BlockNode, Document, MarkdownError, SourceMap
+from textnode import TextType, text_node_to_html_node
 
 
 class BlockType(Enum):
@@ -12,6 +14,7 @@ class BlockType(Enum):
     QUOTE = "quote"
     OLIST = "ordered_list"
     ULIST = "unordered_list"
+    LIST_ITEM = "list_item"
 
 
 def markdown_to_blocks(markdown):
@@ -25,6 +28,55 @@ def markdown_to_blocks(markdown):
     return filtered_blocks
 
 
+class BlockReader:
+    """
+    Reads markdown blocks from a file object one line at a time.
+
+    Iterating yields (block, block_type) pairs identical to markdown_to_blocks
+    and block_to_block_type, holding only the current block in memory. While
+    a block is being consumed, `line` and `column` give its 1-based position
+    in the file. The title found by extract_title is captured in the same pass
+    and is available as `title` once iteration is done (None if there is no h1).
+    Lines are numbered from first_line, e.g. to account for front matter.
+    """
+
+    def __init__(self, file, first_line=1):
+        self.file = file
+        self.first_line = first_line
+        self.title = None
+        self.line = None
+        self.column = None
+
+    def __iter__(self):
+        # Mirrors markdown.split("\n\n"): a blank line ends the block only if
+        # the newline before it was not already consumed by a previous split.
+        piece = []
+        piece_line = self.first_line
+        number = self.first_line - 1
+        for line in self.file:
+            number += 1
+            if self.title is None and line.startswith("# "):
+                self.title = line[2:].strip()
+            if line == "\n" and piece:
+                yield from self._emit("".join(piece)[:-1], piece_line)
+                piece = []
+            else:
+                if not piece:
+                    piece_line = number
+                piece.append(line)
+        if piece:
+            yield from self._emit("".join(piece), piece_line)
+
+    def _emit(self, block, line):
+        if block == "":
+            return
+        stripped = block.strip()
+        lead = len(block) - len(block.lstrip())
+        self.line = line + block.count("\n", 0, lead)
+        self.column = lead - block.rfind("\n", 0, lead)
+        yield stripped, block_to_block_type(stripped)
+
+
 def block_to_block_type(block):
     lines = block.split("\n")
 
@@ -53,33 +105,134 @@ def block_to_block_type(block):
 
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
-    return ParentNode("div", children, None)
+    html_node, _ = markdown_file_to_html_node(io.StringIO(markdown))
+    return html_node
 
 
-def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+def markdown_file_to_html_node(file, first_line=1, links=None):
+    """
+    Converts markdown read from a file object in a single streaming pass.
+    Returns the HTML node and the title, which is None if there is no h1.
+    If links is a list, the URL and source line of every link and image are
+    appended to it, in order.
+    """
+    document = parse_markdown(file, first_line)
+    return document_to_html_node(document, links), document.title
+
+
+def parse_markdown(file, first_line=1):
+    """
+    Parses markdown read from a file object, or any iterable of lines, into a
+    Document of BlockNodes carrying their source positions.
+    """
+    reader = BlockReader(file, first_line)
+    children = [parse_block(block, block_type, reader.line, reader.column) for block, block_type in reader]
+    return Document(children, reader.title)
+
+
+def parse_block(block, block_type=None, line=1, column=1):
+    """
+    Parses a block found at line and column of the source into a BlockNode.
+    """
+    if block_type is None:
+        block_type = block_to_block_type(block)
     if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_html_node(block)
+        # Joining lines with spaces keeps every offset of the block.
+        source_map = SourceMap.from_lines(block, line, column)
+        return BlockNode(block_type, line, column, block.replace("\n", " "), source_map)
     if block_type == BlockType.HEADING:
-        return heading_to_html_node(block)
+        level = len(block) - len(block.lstrip("#"))
+        if level + 1 >= len(block):
+            raise MarkdownError(f"invalid heading level: {level}", line, column)
+        text = block[level + 1 :]
+        source_map = SourceMap.from_lines(text, line, column + level + 1)
+        return BlockNode(block_type, line, column, text, source_map, level)
     if block_type == BlockType.CODE:
-        return code_to_html_node(block)
+        if not block.startswith("```") or not block.endswith("```"):
+            raise MarkdownError("invalid code block", line, column)
+        return BlockNode(block_type, line, column, block[4:-3])
+    if block_type in (BlockType.OLIST, BlockType.ULIST):
+        marker = 3 if block_type == BlockType.OLIST else 2
+        items = []
+        item_column = column
+        for item_line, item in enumerate(block.split("\n"), line):
+            source_map = SourceMap()
+            source_map.add(0, item_line, item_column + marker)
+            items.append(BlockNode(BlockType.LIST_ITEM, item_line, item_column, item[marker:], source_map))
+            item_column = 1
+        return BlockNode(block_type, line, column, children=items)
+    if block_type == BlockType.QUOTE:
+        source_map = SourceMap()
+        parts = []
+        offset = 0
+        quote_column = column
+        for quote_line, text_line in enumerate(block.split("\n"), line):
+            if not text_line.startswith(">"):
+                raise MarkdownError("invalid quote block", quote_line, quote_column)
+            content = text_line.lstrip(">")
+            lead = len(text_line) - len(content.lstrip())
+            content = content.strip()
+            source_map.add(offset, quote_line, quote_column + lead)
+            parts.append(content)
+            offset += len(content) + 1
+            quote_column = 1
+        return BlockNode(block_type, line, column, " ".join(parts), source_map)
+    raise ValueError("invalid block type")
+
+
+def document_to_html_node(document, links=None):
+    return ParentNode("div", [block_node_to_html_node(block, links) for block in document.children], None)
+
+
+def block_node_to_html_node(node, links=None):
+    block_type = node.block_type
+    if block_type == BlockType.PARAGRAPH:
+        return ParentNode("p", text_to_children(node.text, node.source_map, links))
+    if block_type == BlockType.HEADING:
+        return ParentNode(f"h{node.level}", text_to_children(node.text, node.source_map, links))
+    if block_type == BlockType.CODE:
+        return ParentNode("pre", [ParentNode("code", [LeafNode(None, node.text)])])
     if block_type == BlockType.OLIST:
-        return olist_to_html_node(block)
+        return ParentNode("ol", [block_node_to_html_node(item, links) for item in node.children])
     if block_type == BlockType.ULIST:
-        return ulist_to_html_node(block)
+        return ParentNode("ul", [block_node_to_html_node(item, links) for item in node.children])
+    if block_type == BlockType.LIST_ITEM:
+        return ParentNode("li", text_to_children(node.text, node.source_map, links))
     if block_type == BlockType.QUOTE:
-        return quote_to_html_node(block)
+        return ParentNode("blockquote", text_to_children(node.text, node.source_map, links))
     raise ValueError("invalid block type")
 
 
-def text_to_children(text):
-    text_nodes = text_to_textnodes(text)
+def block_to_html_node(block, block_type=None):
+    return block_node_to_html_node(parse_block(block, block_type))
+
+
+# Optional InlineCache shared by every page rendered in this process.
+inline_cache = None
+
+
+def set_inline_cache(cache):
+    global inline_cache
+    inline_cache = cache
+
+
+def text_to_children(text, source_map=None, links=None):
+    if inline_cache is None:
+        return render_inline(text, source_map, links)
+    html = inline_cache.get(text)
+    if html is None:
+        html = "".join(child.to_html() for child in render_inline(text, source_map, links))
+        inline_cache.put(text, html)
+    elif links is not None and "](" in text:
+        # Cached HTML has no source positions, so the links are found again.
+        add_links(text_to_textnodes(text, source_map=source_map), links)
+    return [LeafNode(None, html)]
+
+
+def render_inline(text, source_map=None, links=None):
+    text_nodes = text_to_textnodes(text, source_map=source_map)
+    if links is not None:
+        add_links(text_nodes, links)
     children = []
     for text_node in text_nodes:
         html_node = text_node_to_html_node(text_node)
@@ -87,67 +240,40 @@ def text_to_children(text):
     return children
 
 
+def add_links(text_nodes, links):
+    """
+    Appends (url, line) for every link and image of text_nodes to links, with
+    line None when their position is unknown.
+    """
+    for node in text_nodes:
+        if node.text_type in (TextType.LINK, TextType.IMAGE):
+            position = node.position
+            links.append((node.url, position[0] if position is not None else None))
+
+
 def paragraph_to_html_node(block):
-    lines = block.split("\n")
-    paragraph = " ".join(lines)
-    children = text_to_children(paragraph)
-    return ParentNode("p", children)
+    return block_to_html_node(block, BlockType.PARAGRAPH)
 
 
 def heading_to_html_node(block):
-    level = 0
-    for char in block:
-        if char == "#":
-            level += 1
-        else:
-            break
-    if level + 1 >= len(block):
-        raise ValueError(f"invalid heading level: {level}")
-    text = block[level + 1 :]
-    children = text_to_children(text)
-    return ParentNode(f"h{level}", children)
+    return block_to_html_node(block, BlockType.HEADING)
 
 
 def code_to_html_node(block):
-    if not block.startswith("```") or not block.endswith("```"):
-        raise ValueError("invalid code block")
-    text = block[4:-3]
-    raw_text_node = TextNode(text, TextType.TEXT)
-    child = text_node_to_html_node(raw_text_node)
-    code = ParentNode("code", [child])
-    return ParentNode("pre", [code])
+    return block_to_html_node(block, BlockType.CODE)
 
 
 def olist_to_html_node(block):
-    items = block.split("\n")
-    html_items = []
-    for item in items:
-        text = item[3:]
-        children = text_to_children(text)
-        html_items.append(ParentNode("li", children))
-    return ParentNode("ol", html_items)
+    return block_to_html_node(block, BlockType.OLIST)
 
 
 def ulist_to_html_node(block):
-    items = block.split("\n")
-    html_items = []
-    for item in items:
-        text = item[2:]
-        children = text_to_children(text)
-        html_items.append(ParentNode("li", children))
-    return ParentNode("ul", html_items)
+    return block_to_html_node(block, BlockType.ULIST)
 
 
 def quote_to_html_node(block):
-    lines = block.split("\n")
-    new_lines = []
-    for line in lines:
-        if not line.startswith(">"):
-            raise ValueError("invalid quote block")
-        new_lines.append(line.lstrip(">").strip())
-    content = " ".join(new_lines)
-    children = text_to_children(content)
-    return ParentNode("blockquote", children)
+    return block_to_html_node(block, BlockType.QUOTE)
+
 
 def extract_title(markdown):
     """
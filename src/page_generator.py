@@ -1,24 +1,285 @@
-from markdown_blocks import markdown_to_html_node
-from markdown_blocks import extract_title
+import markdown_blocks
+from file_io import AtomicWriter, InlineWriter, Prefetcher, WriteBehind, WriteStats
+from front_matter import read_front_matter, slot_values
+from markdown_ast import MarkdownError
+from markdown_blocks import markdown_file_to_html_node
+from profiler import NULL_PROFILER, BuildProfiler, TimedFile, profile_output
+from site_index import METADATA_FIELDS, page_metadata
+import io
+import itertools
 import os
 
+# Pages are handed to worker processes in batches of roughly this many bytes
+# of markdown, so that small files share the cost of a round trip to a worker.
+BATCH_BYTES = 256 * 1024
+BATCH_PAGES = 64
+# Pages read ahead of the renderer and outputs waiting to be written, per
+# process, when sources are prefetched and outputs written behind.
+PIPELINE_DEPTH = 16
+# Peak memory of a page being parsed and rendered, per byte of markdown: its
+# source, block tree, HTMLNode tree and output, measured on typical pages.
+PAGE_MEMORY_FACTOR = 32
+# Memory of a worker process before it renders anything: the interpreter,
+# the modules and the template.
+PROCESS_BYTES = 32 * 1024 * 1024
+# Memory of a page waiting in a queue, as source bytes or output chunks, per
+# byte of markdown.
+QUEUED_MEMORY_FACTOR = 4
+
     
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} using template {template_path} to {dest_path}")
-    page = read_file(from_path)
-    template = read_file(template_path)
-    html_node = markdown_to_html_node(page)
-    html_content = html_node.to_html()
-    title = extract_title(page)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html_content)
-    
-    # Replace URL paths with the basepath
-    template = template.replace('href="/', f'href="{basepath}')
-    template = template.replace('src="/', f'src="{basepath}')
-    
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-    write_file(dest_path, template)
+def generate_page(
+    from_path,
+    template,
+    dest_path,
+    profiler=NULL_PROFILER,
+    render_cache=None,
+    source=None,
+    writer=None,
+    links=False,
+):
+    """
+    Renders the markdown at from_path into dest_path using a compiled Template,
+    which also carries the basepath for URLs. With a RenderCache, the article
+    HTML and title of an unchanged source are reused instead of parsing it.
+    The front matter of the page, if any, gives its title in place of the h1
+    and fills the Date and Tags slots and slots named after its other fields.
+
+    source may hold the bytes of from_path if they were already read, and
+    writer may be an InlineWriter or WriteBehind that the output is handed to.
+    Otherwise the page is read and written here. Either way the output is
+    compared with the existing file as it is rendered, and written atomically
+    from the first difference, or not at all if its content is unchanged.
+
+    The page is profiled in the read, parse, render (HTML serialization and
+    template), write and render_cache stages.
+
+    Returns the title, the article, as an HTML string or an HTMLNode, the
+    front matter fields and, if links is set, the (url, line) of every link
+    and image in the source, or None.
+    """
+    print(f"Generating page from {from_path} using template {template.path} to {dest_path}")
+    if source is not None:
+        file = io.TextIOWrapper(io.BytesIO(source))
+    else:
+        file = open(from_path, 'r')
+    with file:
+        lines = file
+        parse_stage = profiler.stage
+        if source is None and profiler is not NULL_PROFILER:
+            # The file is read as it is parsed; reads are profiled apart.
+            lines = TimedFile(file, profiler)
+            parse_stage = lines.stage
+        with parse_stage("parse"):
+            try:
+                front, body, header_lines = read_front_matter(lines)
+            except MarkdownError as e:
+                e.path = from_path
+                raise
+        cached = None
+        if render_cache is not None:
+            with profiler.stage("render_cache"):
+                if source is not None:
+                    key = render_cache.key(source)
+                else:
+                    key = render_cache.key_file(from_path)
+                cached = render_cache.get(key)
+        if cached is not None:
+            title, html_node, page_links = cached
+        else:
+            # Cache entries always carry the links, whoever reads them next.
+            page_links = [] if links or render_cache is not None else None
+            with parse_stage("parse"):
+                try:
+                    html_node, title = markdown_file_to_html_node(
+                        itertools.chain(body, lines), header_lines + 1, page_links
+                    )
+                except MarkdownError as e:
+                    e.path = from_path
+                    raise
+            if front.get("title"):
+                title = front["title"]
+            if title is None:
+                raise Exception("No h1 header found in markdown")
+            if render_cache is not None:
+                with profiler.stage("render"):
+                    html_node = html_node.to_html()
+                with profiler.stage("render_cache"):
+                    render_cache.put(key, title, html_node, page_links)
+
+    values = {**slot_values(front), "Title": title, "Content": html_node}
+
+    def render(write):
+        template.stream(write, **values)
+
+    if writer is None:
+        writer = InlineWriter()
+    if profiler is NULL_PROFILER:
+        writer.write(dest_path, render, from_path)
+    else:
+        profile_output(profiler, lambda render: writer.write(dest_path, render, from_path), render)
+    return title, html_node, front, page_links if links else None
+
+
+def collect_metadata(metadata, from_path, dest_path, page, profiler, fields=METADATA_FIELDS):
+    if metadata is None:
+        return
+    title, html_node, front, links = page
+    with profiler.stage("metadata"):
+        article_html = html_node if isinstance(html_node, str) else html_node.to_html()
+        metadata[dest_path] = page_metadata(from_path, title, article_html, fields, front, links)
+
+def failure_message(e):
+    if isinstance(e, MarkdownError):
+        return str(e)
+    return f"{type(e).__name__}: {e}"
+
+def generate_pages(
+    pages,
+    template,
+    profiler=NULL_PROFILER,
+    render_cache=None,
+    io_threads=0,
+    stats=None,
+    metadata=None,
+    postprocessor=None,
+    fields=METADATA_FIELDS,
+    depth=PIPELINE_DEPTH,
+):
+    """
+    Generates every (from_path, dest_path) pair in pages, carrying on past
+    failures. Returns a list of (from_path, error message) for the pages that failed.
+
+    With io_threads > 0, sources are prefetched and outputs written behind the
+    renderer on that many threads each, with at most depth pages in each
+    queue. Changed and unchanged outputs are counted in stats, a WriteStats,
+    if given. If metadata is a dict, the page_metadata of every generated page,
+    with the optional groups in fields, is added to it by output path.
+    Outputs are minified and precompressed by postprocessor, if given.
+    """
+    failures = []
+    links = metadata is not None and "links" in fields
+    if io_threads <= 0:
+        writer = InlineWriter(stats, postprocessor)
+        for from_path, dest_path in pages:
+            try:
+                with profiler.page(from_path):
+                    page = generate_page(
+                        from_path, template, dest_path, profiler, render_cache, writer=writer, links=links
+                    )
+                    collect_metadata(metadata, from_path, dest_path, page, profiler, fields)
+            except Exception as e:
+                failures.append((from_path, failure_message(e)))
+        return failures
+
+    sources = Prefetcher([from_path for from_path, _ in pages], io_threads, depth)
+    with WriteBehind(io_threads, depth, stats, postprocessor) as writer, sources:
+        for (from_path, dest_path), source in zip(pages, sources):
+            try:
+                with profiler.page(from_path):
+                    page = generate_page(
+                        from_path, template, dest_path, profiler, render_cache, source.result(), writer, links
+                    )
+                    collect_metadata(metadata, from_path, dest_path, page, profiler, fields)
+            except Exception as e:
+                failures.append((from_path, failure_message(e)))
+    return failures + writer.errors
+
+
+def generate_batch(
+    pages,
+    template,
+    *,
+    profile=False,
+    render_cache=None,
+    io_threads=0,
+    collect=None,
+    postprocessor=None,
+    depth=PIPELINE_DEPTH,
+):
+    """
+    Worker entry point for generate_pages. Returns the failures, the
+    BuildProfiler of the batch (None when profiling is off), the inline
+    cache (hits, misses) of the batch (None when the cache is off), the
+    WriteStats of the batch and its page metadata. collect holds the optional
+    metadata fields to collect, or is None to collect no metadata.
+    """
+    cache = markdown_blocks.inline_cache
+    before = (cache.hits, cache.misses) if cache is not None else None
+    profiler = BuildProfiler() if profile else None
+    stats = WriteStats()
+    metadata = {} if collect is not None else None
+    failures = generate_pages(
+        pages,
+        template,
+        profiler or NULL_PROFILER,
+        render_cache,
+        io_threads,
+        stats,
+        metadata,
+        postprocessor,
+        collect or (),
+        depth,
+    )
+    if cache is None:
+        return failures, profiler, None, stats, metadata
+    return failures, profiler, (cache.hits - before[0], cache.misses - before[1]), stats, metadata
+
+class PipelineLimits:
+    """
+    Bounds on the pages in flight through read, parse, render and write: the
+    number of worker processes, the batches submitted to them but not yet
+    collected, and the depth of each process's read-ahead and write-behind
+    queues. Rendering blocks when they are full, so memory stays bounded
+    however many pages the site has.
+    """
+
+    __slots__ = ("jobs", "in_flight", "depth")
+
+    def __init__(self, jobs=1, in_flight=None, depth=PIPELINE_DEPTH):
+        self.jobs = jobs
+        self.in_flight = in_flight if in_flight is not None else 2 * jobs
+        self.depth = depth
+
+    @classmethod
+    def from_budget(cls, budget, jobs, largest, average):
+        """
+        Fits the pipeline in budget bytes of memory, given the size of the
+        largest and average markdown page.
+
+        Every process needs PROCESS_BYTES, and half of the rest is left to
+        the site-wide state of the main process (manifest and page metadata).
+        Worker processes are dropped until each gets at least as much again
+        for the pages it renders: one at a time, plus its queues.
+        """
+        workers = max(1, jobs)
+        while workers > 1 and budget < (workers + 1) * PROCESS_BYTES * 2:
+            workers -= 1
+        processes = workers + 1 if workers > 1 else 1
+        share = max(0, budget - processes * PROCESS_BYTES) // 2 // workers
+        free = share - largest * PAGE_MEMORY_FACTOR
+        depth = free // max(1, average * QUEUED_MEMORY_FACTOR * 2)
+        return cls(workers, 2 * workers, max(1, min(PIPELINE_DEPTH, depth)))
+
+
+def batch_pages(pages, max_bytes=BATCH_BYTES, max_pages=BATCH_PAGES):
+    """
+    Groups (from_path, dest_path) pairs into batches of at most max_pages pages
+    and, unless a single page is larger, at most max_bytes of markdown.
+    """
+    batches = []
+    batch = []
+    batch_bytes = 0
+    for page in pages:
+        size = os.path.getsize(page[0])
+        if batch and (batch_bytes + size > max_bytes or len(batch) >= max_pages):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(page)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
 
 def read_file(path):
     with open(path, 'r') as file:
@@ -26,5 +287,5 @@ def read_file(path):
     return content
 
 def write_file(path, content):
-    with open(path, 'w') as file:
+    with AtomicWriter(path) as file:
         file.write(content)
\ No newline at end of file
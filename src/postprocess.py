@@ -0,0 +1,168 @@
+import gzip
+import os
+import re
+
+from file_io import AtomicWriter
+
+# brotli is optional: without it only .gz siblings are written.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".json", ".xml", ".svg", ".txt")
+TAG_PATTERN = re.compile(r"(<[^>]*>)")
+TAG_NAME_PATTERN = re.compile(r"</?([a-zA-Z0-9!]+)")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Elements whose content is kept exactly as written.
+RAW_TAGS = frozenset(("pre", "textarea", "script", "style"))
+# Elements around which whitespace never renders.
+BLOCK_TAGS = frozenset(
+    (
+        "!doctype", "html", "head", "body", "title", "meta", "link", "script", "style",
+        "article", "aside", "blockquote", "div", "footer", "header", "main", "nav", "section",
+        "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "pre", "hr", "br",
+        "table", "thead", "tbody", "tr", "th", "td",
+    )
+)
+# Strings and comments, matched in one pass so that quotes in comments and
+# comment markers in strings are both ignored.
+CSS_LITERAL_PATTERN = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|/\*.*?\*/)""", re.S)
+CSS_PLACEHOLDER_PATTERN = re.compile(r"\0(\d+)\0")
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,])\s*")
+CSS_DECLARATIONS_PATTERN = re.compile(r"\{[^{}]*\}")
+
+
+def tag_name(tag):
+    match = TAG_NAME_PATTERN.match(tag)
+    return match.group(1).lower() if match else None
+
+
+def minify_html(html):
+    """
+    Collapses whitespace in text to a single space and drops whitespace next
+    to block-level tags. Content of pre, textarea, script and style elements
+    and the inside of tags are left untouched.
+    """
+    parts = TAG_PATTERN.split(html)
+    raw = 0
+    for i in range(0, len(parts), 2):
+        if i > 0:
+            name = tag_name(parts[i - 1])
+            if name in RAW_TAGS:
+                raw += -1 if parts[i - 1].startswith("</") else 1
+        text = parts[i]
+        if raw > 0 or not text:
+            continue
+        text = WHITESPACE_PATTERN.sub(" ", text)
+        if text == " " and (
+            (i > 0 and tag_name(parts[i - 1]) in BLOCK_TAGS)
+            or (i + 1 < len(parts) and tag_name(parts[i + 1]) in BLOCK_TAGS)
+            or i == 0
+            or i + 1 == len(parts)
+        ):
+            text = ""
+        parts[i] = text
+    return "".join(parts)
+
+
+def minify_css(css):
+    """
+    Removes comments and whitespace that does not separate tokens, leaving
+    string literals untouched.
+    """
+    strings = []
+
+    def hold(match):
+        if match.group(0).startswith("/*"):
+            return ""
+        strings.append(match.group(0))
+        return f"\0{len(strings) - 1}\0"
+
+    # Strings are set aside so their content is never rewritten.
+    text = CSS_LITERAL_PATTERN.sub(hold, css)
+    text = WHITESPACE_PATTERN.sub(" ", text)
+    text = CSS_PUNCTUATION_PATTERN.sub(r"\1", text)
+    # Only inside declaration blocks: in a selector, "a :hover" differs from "a:hover".
+    text = CSS_DECLARATIONS_PATTERN.sub(lambda match: match.group(0).replace(": ", ":"), text)
+    text = text.replace(";}", "}").strip()
+    return CSS_PLACEHOLDER_PATTERN.sub(lambda match: strings[int(match.group(1))], text)
+
+
+class PostProcessor:
+    """
+    Minifies HTML and CSS outputs and writes precompressed `.gz` (and, with
+    brotli, `.br`) siblings of text outputs.
+
+    A sibling gets the mtime of the file it was compressed from, so it is
+    only recompressed once the file changes. Outputs are left untouched when
+    their content does not change, which keeps that check cheap.
+    """
+
+    def __init__(self, minify=False, precompress=False):
+        self.minify = minify
+        self.precompress = precompress
+
+    @property
+    def formats(self):
+        if not self.precompress:
+            return ()
+        if brotli is None:
+            return (".gz",)
+        return (".gz", ".br")
+
+    def process(self, path, chunks):
+        """
+        Returns the chunks of the output at path, minified if enabled.
+        """
+        if not self.minify:
+            return chunks
+        if path.endswith(".html"):
+            return [minify_html("".join(chunks))]
+        if path.endswith(".css"):
+            return [minify_css("".join(chunks))]
+        return chunks
+
+    def transforms(self, path):
+        return self.minify and path.endswith((".html", ".css"))
+
+    def compress(self, path):
+        """
+        Writes the compressed siblings of path that are missing or older than
+        path. Returns the number written.
+        """
+        formats = self.formats
+        if not formats or not path.endswith(COMPRESSIBLE_EXTENSIONS):
+            return 0
+        stat = os.stat(path)
+        stale = [ext for ext in formats if not fresh(path + ext, stat)]
+        if not stale:
+            return 0
+        with open(path, "rb") as file:
+            data = file.read()
+        for ext in stale:
+            if ext == ".gz":
+                compressed = gzip.compress(data, 9, mtime=0)
+            else:
+                compressed = brotli.compress(data)
+            with AtomicWriter(path + ext, "wb") as file:
+                file.write(compressed)
+            os.utime(path + ext, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        return len(stale)
+
+    def register(self, manifest):
+        """
+        Records the compressed siblings of every output of the build in the
+        manifest, so they are kept by stale-output cleanup.
+        """
+        for path in list(manifest.current):
+            if path.endswith(COMPRESSIBLE_EXTENSIONS):
+                for ext in self.formats:
+                    manifest.current[path + ext] = {"source": path}
+
+
+def fresh(path, stat):
+    try:
+        return os.stat(path).st_mtime_ns == stat.st_mtime_ns
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,149 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+_NO_STAGE = nullcontext()
+
+
+class NullProfiler:
+    """
+    Stand-in used when profiling is off: stages are a shared no-op context.
+    """
+
+    def stage(self, name):
+        return _NO_STAGE
+
+    def page(self, path):
+        return _NO_STAGE
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _Timer:
+    __slots__ = ("table", "key", "start")
+
+    def __init__(self, table, key):
+        self.table = table
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        entry = self.table.get(self.key)
+        if entry is None:
+            self.table[self.key] = [elapsed, 1]
+        else:
+            entry[0] += elapsed
+            entry[1] += 1
+        return False
+
+
+class BuildProfiler:
+    """
+    Records wall time and call counts per pipeline stage and per page.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.pages = {}
+
+    def stage(self, name):
+        return _Timer(self.stages, name)
+
+    def page(self, path):
+        return _Timer(self.pages, path)
+
+    def add(self, name, seconds, calls=1):
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    def merge(self, other):
+        for table, other_table in ((self.stages, other.stages), (self.pages, other.pages)):
+            for key, (seconds, calls) in other_table.items():
+                entry = table.setdefault(key, [0.0, 0])
+                entry[0] += seconds
+                entry[1] += calls
+
+    def report(self, top=10):
+        lines = []
+        total = sum(seconds for seconds, _ in self.stages.values()) or 1.0
+        lines.append(f"{'stage':<20} {'calls':>8} {'total s':>10} {'mean ms':>10} {'share':>7}")
+        for name, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0]):
+            lines.append(
+                f"{name:<20} {calls:>8} {seconds:>10.4f} {seconds / calls * 1000:>10.3f} {seconds / total:>7.1%}"
+            )
+        lines.append("")
+        lines.append(f"slowest {min(top, len(self.pages))} of {len(self.pages)} pages:")
+        slowest = sorted(self.pages.items(), key=lambda item: -item[1][0])[:top]
+        for path, (seconds, _) in slowest:
+            lines.append(f"{seconds * 1000:>10.3f} ms  {path}")
+        return "\n".join(lines)
+
+
+class TimedFile:
+    """
+    Text file read line by line while it is parsed, whose reads are profiled
+    in the read stage rather than in the stage that consumes them.
+    """
+
+    def __init__(self, file, profiler):
+        self.file = file
+        self.profiler = profiler
+        self.seconds = 0.0
+
+    def readline(self):
+        start = time.perf_counter()
+        line = self.file.readline()
+        self.seconds += time.perf_counter() - start
+        return line
+
+    def __iter__(self):
+        return iter(self.readline, "")
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times a stage of the profiler like BuildProfiler.stage, less the time
+        spent reading the file, which is added to the read stage.
+        """
+        before = self.seconds
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            read = self.seconds - before
+            self.profiler.add(name, time.perf_counter() - start - read)
+            self.profiler.add("read", read)
+
+
+def profile_output(profiler, output, render):
+    """
+    Calls output(render) for a render function whose chunks output writes as
+    they are rendered, as InlineWriter does. The time spent in the write calls
+    is profiled in the write stage with the rest of output's work, and only
+    the rendering proper in the render stage.
+    """
+    written = 0.0
+    rendering = 0.0
+
+    def timed_render(write):
+        nonlocal written, rendering
+
+        def timed_write(chunk):
+            nonlocal written
+            start = time.perf_counter()
+            write(chunk)
+            written += time.perf_counter() - start
+
+        before = written
+        start = time.perf_counter()
+        render(timed_write)
+        rendering += time.perf_counter() - start - (written - before)
+
+    start = time.perf_counter()
+    output(timed_render)
+    profiler.add("write", time.perf_counter() - start - rendering)
+    profiler.add("render", rendering)
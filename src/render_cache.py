@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import tempfile
+
+# Bump whenever a change to the markdown -> HTML conversion alters its output
+# or the format of cache entries changes, so entries rendered by an older
+# generator are never reused and incremental builds rebuild its pages.
+GENERATOR_VERSION = "3"
+
+
+class RenderCache:
+    """
+    Content-addressed on-disk cache of rendered article HTML, page titles and
+    the (url, line) of every link in the source.
+
+    Entries are keyed by a hash of the markdown source and GENERATOR_VERSION,
+    so the cache directory can be shared between builds and machines. Hits
+    refresh an entry's mtime, and evict() removes the least recently used
+    entries until the cache fits in max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, markdown):
+        digest = hashlib.sha256(GENERATOR_VERSION.encode())
+        digest.update(b"\0")
+        digest.update(markdown)
+        return digest.hexdigest()
+
+    def key_file(self, path):
+        digest = hashlib.sha256(GENERATOR_VERSION.encode())
+        digest.update(b"\0")
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 16), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns (title, html, links) for key, or None on a miss.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "r") as file:
+                entry = json.load(file)
+            # A truncated or foreign entry is a miss like a missing one.
+            hit = entry["title"], entry["html"], [tuple(link) for link in entry["links"]]
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return hit
+
+    def put(self, key, title, html, links=()):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump({"title": title, "html": html, "links": list(links)}, file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes.
+        Returns the number of entries and bytes left in the cache.
+        """
+        entries = []
+        total = 0
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for file in files:
+                    path = os.path.join(root, file)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime_ns, stat.st_size, path))
+                    total += stat.st_size
+        entries.sort()
+        evicted = 0
+        while total > self.max_bytes and evicted < len(entries):
+            _, size, path = entries[evicted]
+            os.remove(path)
+            total -= size
+            evicted += 1
+        return len(entries) - evicted, total
@@ -0,0 +1,236 @@
+import html
+import json
+import os
+import re
+import textwrap
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from file_io import write_if_changed
+from front_matter import timestamp
+from link_check import extract_anchors, extract_links
+
+TAG_PATTERN = re.compile(r"<(/?)(\w*)[^>]*>")
+# Tags that do not separate words when stripped.
+INLINE_TAGS = frozenset(("a", "b", "code", "em", "i", "img", "span", "strong"))
+WORD_PATTERN = re.compile(r"\w+")
+EXCERPT_CHARS = 200
+FEED_ENTRIES = 20
+SEARCH_INDEX_VERSION = 1
+# Bump whenever page_metadata gains or changes a field, so that metadata
+# stored in the manifest by an older build is collected again.
+METADATA_VERSION = 5
+# Optional groups of page_metadata fields, collected only for the outputs
+# that need them: "links" (links and anchors) for the link check and
+# "terms" for the search index.
+METADATA_FIELDS = ("links", "terms")
+
+
+def plain_text(article_html):
+    """
+    Returns the text of an HTML fragment with tags removed and entities decoded.
+    """
+    return html.unescape(TAG_PATTERN.sub(strip_tag, article_html))
+
+
+def strip_tag(match):
+    return "" if match.group(2) in INLINE_TAGS else " "
+
+
+def page_metadata(from_path, title, article_html, fields=METADATA_FIELDS, front=None, links=None):
+    """
+    Collects what the sitemap, feed, search index and link check need to know
+    about a rendered page, so they can be written without parsing it again.
+    Of the METADATA_FIELDS groups, only those in fields are collected, since
+    the metadata of every page is held until the end of the build. Terms are
+    kept as a single space-separated string for the same reason.
+
+    The date in the front matter of the page, if any, is used as its update
+    time instead of the mtime of its source, and its tags are kept. links
+    holds the (url, line) of the links found while parsing the page, which
+    give each link of the article the line it first appears on.
+    """
+    text = " ".join(plain_text(article_html).split())
+    words = WORD_PATTERN.findall(text.lower())
+    front = front or {}
+    if "date" in front:
+        updated = timestamp(front["date"])
+    else:
+        mtime = datetime.fromtimestamp(os.stat(from_path).st_mtime, timezone.utc)
+        updated = mtime.strftime("%Y-%m-%dT%H:%M:%SZ")
+    # The article usually opens with its own title, which the excerpt skips.
+    excerpt = text[len(title):] if text.startswith(title) else text
+    meta = {
+        "version": METADATA_VERSION,
+        "source": from_path,
+        "title": title,
+        "excerpt": textwrap.shorten(excerpt, EXCERPT_CHARS, placeholder="…"),
+        "words": len(words),
+        "updated": updated,
+    }
+    if front.get("tags"):
+        meta["tags"] = front["tags"]
+    if "terms" in fields:
+        meta["terms"] = " ".join(sorted({word for word in words if len(word) > 1}))
+    if "links" in fields:
+        lines = {}
+        for url, line in links or ():
+            lines.setdefault(url, line)
+        meta["links"] = [[url, lines.get(url)] for url in extract_links(article_html)]
+        meta["anchors"] = extract_anchors(article_html)
+    return meta
+
+
+def has_fields(meta, fields):
+    """
+    Returns True if meta was collected by this version with every group in fields.
+    """
+    if meta is None or meta.get("version") != METADATA_VERSION:
+        return False
+    return all(field in meta for field in fields)
+
+
+def page_url(output_path, docs_dir, basepath):
+    """
+    Returns the URL an output in docs_dir is served at, with index.html
+    files addressed by their directory.
+    """
+    relative_path = os.path.relpath(output_path, docs_dir).replace(os.sep, "/")
+    if relative_path == "index.html":
+        relative_path = ""
+    elif relative_path.endswith("/index.html"):
+        relative_path = relative_path[: -len("index.html")]
+    return basepath + relative_path
+
+
+def sitemap(pages, site_url):
+    """
+    Returns sitemap.xml for pages, a list of (url, metadata) pairs.
+    """
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for url, meta in pages:
+        lines.append(
+            f"  <url><loc>{escape(site_url + url)}</loc><lastmod>{meta['updated'][:10]}</lastmod></url>"
+        )
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def atom_feed(pages, site_url, feed_url, title, author=None):
+    """
+    Returns an Atom feed of the FEED_ENTRIES most recently updated of pages,
+    a list of (url, metadata) pairs. The author of the feed, which Atom
+    requires, defaults to its title.
+    """
+    entries = sorted(pages, key=lambda page: (page[1]["updated"], page[0]), reverse=True)[:FEED_ENTRIES]
+    updated = entries[0][1]["updated"] if entries else "1970-01-01T00:00:00Z"
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"  <title>{escape(title)}</title>",
+        f'  <link href="{escape(site_url + feed_url)}" rel="self" />',
+        f"  <id>{escape(site_url + feed_url)}</id>",
+        f"  <updated>{updated}</updated>",
+        f"  <author><name>{escape(author or title)}</name></author>",
+    ]
+    for url, meta in entries:
+        lines.extend(
+            [
+                "  <entry>",
+                f"    <title>{escape(meta['title'])}</title>",
+                f'    <link href="{escape(site_url + url)}" />',
+                f"    <id>{escape(site_url + url)}</id>",
+                f"    <updated>{meta['updated']}</updated>",
+                f"    <summary>{escape(meta['excerpt'])}</summary>",
+                "  </entry>",
+            ]
+        )
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+
+def search_index(pages):
+    """
+    Returns a compact search index of pages, a list of (url, metadata) pairs.
+
+    Pages are numbered by their position in "pages". Terms are sorted and
+    front-coded: "prefixes"[i] characters are shared with the previous term
+    and "suffixes"[i] holds the rest. "postings"[i] lists the ids of the pages
+    containing term i as gaps from the previous id.
+    """
+    postings = {}
+    for page_id, (_, meta) in enumerate(pages):
+        for term in meta["terms"].split():
+            postings.setdefault(term, []).append(page_id)
+    prefixes = []
+    suffixes = []
+    gaps = []
+    previous = ""
+    for term in sorted(postings):
+        shared = len(os.path.commonprefix([previous, term]))
+        prefixes.append(shared)
+        suffixes.append(term[shared:])
+        ids = postings[term]
+        gaps.append([ids[0]] + [b - a for a, b in zip(ids, ids[1:])])
+        previous = term
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "pages": [[url, meta["title"], meta["excerpt"], meta["words"]] for url, meta in pages],
+        "prefixes": prefixes,
+        "suffixes": suffixes,
+        "postings": gaps,
+    }
+
+
+def decode_search_index(index):
+    """
+    Expands a search index back into {term: [page ids]}.
+    """
+    terms = {}
+    term = ""
+    for shared, suffix, gaps in zip(index["prefixes"], index["suffixes"], index["postings"]):
+        term = term[:shared] + suffix
+        ids = []
+        page_id = 0
+        for gap in gaps:
+            page_id += gap
+            ids.append(page_id)
+        terms[term] = ids
+    return terms
+
+
+def write_site_artifacts(
+    metadata, docs_dir, basepath, content_dir, site_url=None, search=False, manifest=None, author=None
+):
+    """
+    Writes sitemap.xml and an Atom feed of the blog by author, or the site
+    title, (when site_url is given) and search.json (when search is set) from the metadata collected while
+    rendering, a dict of output path -> page_metadata. Returns the paths written.
+    """
+    pages = sorted(
+        ((page_url(path, docs_dir, basepath), meta) for path, meta in metadata.items()),
+        key=lambda page: page[0],
+    )
+    artifacts = {}
+    if site_url is not None:
+        site_url = site_url.rstrip("/")
+        artifacts["sitemap.xml"] = sitemap(pages, site_url)
+        blog_dir = os.path.join(content_dir, "blog") + os.sep
+        posts = [(url, meta) for url, meta in pages if meta["source"].startswith(blog_dir)]
+        home = metadata.get(os.path.join(docs_dir, "index.html"))
+        title = home["title"] if home is not None else site_url
+        artifacts["feed.xml"] = atom_feed(posts, site_url, basepath + "feed.xml", title, author)
+    if search:
+        artifacts["search.json"] = json.dumps(search_index(pages), ensure_ascii=False, separators=(",", ":"))
+    written = []
+    for name, content in artifacts.items():
+        path = os.path.join(docs_dir, name)
+        if manifest is not None:
+            manifest.current[path] = {"artifact": name}
+        if write_if_changed(path, [content]):
+            print(f"Writing {path}")
+        written.append(path)
+    return written
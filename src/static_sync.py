@@ -0,0 +1,161 @@
+import os
+import shutil
+
+from build_manifest import hash_file
+from file_io import write_if_changed
+
+LINK_MODES = ("copy", "hardlink", "reflink")
+CHECK_MODES = ("mtime", "hash")
+
+# ioctl request number of FICLONE on Linux, which shares extents between files
+# on copy-on-write filesystems such as Btrfs and XFS.
+FICLONE = 0x40049409
+
+
+def reflink(source, destination):
+    """
+    Clones source into destination without copying its bytes. Returns False
+    if the platform or filesystem does not support it.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            return False
+    shutil.copystat(source, destination)
+    return True
+
+
+def place_file(source, destination, link="copy"):
+    """
+    Puts a copy of source at destination, by hardlink, reflink or byte copy,
+    falling back to a byte copy when the requested link is not possible.
+    """
+    # Never write through an existing file: it may be a hardlink to the source.
+    if os.path.lexists(destination):
+        os.remove(destination)
+    if link == "hardlink":
+        try:
+            os.link(source, destination)
+            return
+        except OSError:
+            pass
+    elif link == "reflink" and reflink(source, destination):
+        return
+    shutil.copy2(source, destination)
+
+
+def unchanged(destination, stat):
+    try:
+        dest_stat = os.stat(destination)
+    except FileNotFoundError:
+        return False
+    return dest_stat.st_size == stat.st_size and dest_stat.st_mtime_ns == stat.st_mtime_ns
+
+
+def same_content(destination, stat, source_hash):
+    try:
+        if os.path.getsize(destination) != stat.st_size:
+            return False
+    except FileNotFoundError:
+        return False
+    return hash_file(destination) == source_hash
+
+
+def sync_static(
+    source, destination, manifest=None, link="copy", check="mtime", postprocessor=None, assets=None
+):
+    """
+    Mirrors the source directory into destination, skipping unchanged files.
+
+    With check="mtime" a file is unchanged when its size and mtime match the
+    previous build (or the existing output when the manifest has no record of
+    it). With check="hash" it is unchanged when its content hash matches, and
+    the hash is only recomputed for files whose size or mtime changed.
+
+    With a PostProcessor, files it transforms (stylesheets when minifying)
+    are written minified instead of placed, and compressed siblings of every
+    file are kept up to date. With an AssetMap, assets are copied under their
+    fingerprinted names, and the url() references of stylesheets are pointed
+    at the fingerprinted names of the assets they reference.
+
+    Returns the number of files copied and the number skipped.
+    """
+    copied = 0
+    skipped = 0
+    with os.scandir(source) as entries:
+        for entry in entries:
+            destination_path = os.path.join(destination, entry.name)
+            if entry.is_dir():
+                if not os.path.isdir(destination_path):
+                    print(f"Creating directory {destination_path}")
+                    os.mkdir(destination_path)
+                sub_copied, sub_skipped = sync_static(
+                    entry.path, destination_path, manifest, link, check, postprocessor, assets
+                )
+                copied += sub_copied
+                skipped += sub_skipped
+                continue
+            stat = entry.stat()
+            record = {"source": entry.path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            rewrite = False
+            if assets is not None and entry.path in assets.sources:
+                name, record["source_hash"] = assets.sources[entry.path]
+                destination_path = os.path.join(destination, name)
+                if destination_path.endswith(".css"):
+                    rewrite = True
+                    record["assets"] = assets.digest
+            minify = postprocessor is not None and postprocessor.transforms(destination_path)
+            if minify:
+                record["minify"] = True
+            transform = minify or rewrite
+            if manifest is None:
+                fresh = check == "mtime" and unchanged(destination_path, stat)
+            elif check == "hash":
+                previous = manifest.previous.get(destination_path, {})
+                if record.get("source_hash") is None and (
+                    previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns
+                ):
+                    record["source_hash"] = previous.get("source_hash")
+                if record.get("source_hash") is None:
+                    record["source_hash"] = hash_file(entry.path)
+                fresh = not manifest.check(destination_path, record, ("source", "source_hash", "minify", "assets"))
+            else:
+                fresh = not manifest.check(destination_path, record, ("source", "size", "mtime_ns", "minify", "assets"))
+            if not fresh and transform:
+                # A transformed output never matches its source, so it is only
+                # compared by content once written.
+                with open(entry.path, "r") as file:
+                    chunks = [file.read()]
+                if rewrite:
+                    chunks = [assets.rewrite_css(chunks[0], entry.path)]
+                if minify:
+                    chunks = postprocessor.process(destination_path, chunks)
+                if write_if_changed(destination_path, chunks):
+                    print(f"{'Minifying' if minify else 'Rewriting'} {entry.path} to {destination_path}")
+                    copied += 1
+                else:
+                    skipped += 1
+                if postprocessor is not None:
+                    postprocessor.compress(destination_path)
+                continue
+            if not fresh and manifest is not None and destination_path not in manifest.previous:
+                # Nothing is known about an existing output (e.g. in a full
+                # build), so compare it with the source directly.
+                if check == "hash":
+                    fresh = same_content(destination_path, stat, record["source_hash"])
+                else:
+                    fresh = unchanged(destination_path, stat)
+            if fresh:
+                skipped += 1
+            else:
+                print(f"Copying {entry.path} to {destination_path}")
+                place_file(entry.path, destination_path, link)
+                copied += 1
+            if postprocessor is not None:
+                postprocessor.compress(destination_path)
+    return copied, skipped
@@ -0,0 +1,128 @@
+import os
+import re
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+INCLUDE_PATTERN = re.compile(r"\{\{> (\S+) \}\}")
+URL_PATTERN = re.compile(r'((?:href|src)=")(/[^"?#]*)')
+
+
+def rewrite_urls(html, basepath, assets=None):
+    """
+    Prefixes root-relative href and src attributes with the basepath and,
+    with an AssetMap, points references to assets at their fingerprinted
+    names, in a single pass over html.
+    """
+    if assets is None:
+        if basepath == "/":
+            return html
+        html = html.replace('href="/', f'href="{basepath}')
+        return html.replace('src="/', f'src="{basepath}')
+    prefix = basepath[:-1]
+    urls = assets.urls
+
+    def replace(match):
+        url = match.group(2)
+        return f"{match.group(1)}{prefix}{urls.get(url, url)}"
+
+    return URL_PATTERN.sub(replace, html)
+
+
+def expand_includes(text, directory, dependencies, stack=()):
+    """
+    Replaces `{{> path }}` with the contents of the partial at path, relative
+    to directory, recursively. Every partial read is appended to dependencies.
+    """
+
+    def include(match):
+        path = os.path.normpath(os.path.join(directory, match.group(1)))
+        if path in stack:
+            raise ValueError(f"template include cycle: {' -> '.join(stack + (path,))}")
+        with open(path, "r") as file:
+            partial = file.read()
+        if path not in dependencies:
+            dependencies.append(path)
+        return expand_includes(partial, os.path.dirname(path), dependencies, stack + (path,))
+
+    return INCLUDE_PATTERN.sub(include, text)
+
+
+class Template:
+    """
+    A page template split once into static segments and `{{ Name }}` slots.
+
+    The basepath rewrite of the template's own URLs is applied to the segments
+    when the template is compiled, so rendering a page is a single join.
+    Partials included with `{{> path }}` are inlined at compile time, and
+    `dependencies` lists the template file and every partial it read, and
+    `text` holds the template with its partials inlined. With an ImageIndex,
+    `<img>` tags in slot values gain srcset, width, height and lazy loading.
+    With an AssetMap, references to assets use their fingerprinted names.
+    """
+
+    def __init__(self, text, basepath="/", path=None, images=None, assets=None):
+        self.basepath = basepath
+        self.images = images
+        self.assets = assets
+        self.path = path
+        self.dependencies = [path] if path is not None else []
+        directory = os.path.dirname(path) if path is not None else ""
+        text = expand_includes(text, directory or ".", self.dependencies, tuple(self.dependencies))
+        self.text = text
+        self.segments = []
+        self.slots = []
+        pos = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.segments.append(rewrite_urls(text[pos : match.start()], basepath, assets))
+            self.slots.append((match.group(1), match.group(0)))
+            pos = match.end()
+        self.segments.append(rewrite_urls(text[pos:], basepath, assets))
+
+    @classmethod
+    def from_file(cls, path, basepath="/", images=None, assets=None):
+        with open(path, "r") as file:
+            return cls(file.read(), basepath, path, images, assets)
+
+    def rewrite(self, html):
+        if self.images is not None:
+            html = self.images.rewrite(html)
+        return rewrite_urls(html, self.basepath, self.assets)
+
+    def render(self, **values):
+        """
+        Fills the slots with values, rewriting URLs inside them to the basepath.
+        Slots without a value are left as they appear in the template.
+        """
+        parts = [self.segments[0]]
+        for (name, placeholder), segment in zip(self.slots, self.segments[1:]):
+            value = values.get(name)
+            if value is None:
+                parts.append(rewrite_urls(placeholder, self.basepath, self.assets))
+            else:
+                parts.append(self.rewrite(value))
+            parts.append(segment)
+        return "".join(parts)
+
+    def stream(self, write, **values):
+        """
+        Like render, but passes the page to write in chunks. Values may be
+        strings or HTMLNodes, which are serialized straight into write.
+        """
+        basepath = self.basepath
+        images = self.images
+        assets = self.assets
+
+        def write_rewritten(chunk):
+            if images is not None:
+                chunk = images.rewrite(chunk)
+            write(rewrite_urls(chunk, basepath, assets))
+
+        write(self.segments[0])
+        for (name, placeholder), segment in zip(self.slots, self.segments[1:]):
+            value = values.get(name)
+            if value is None:
+                write_rewritten(placeholder)
+            elif isinstance(value, str):
+                write_rewritten(value)
+            else:
+                value.write_html(write_rewritten)
+            write(segment)
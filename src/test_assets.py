@@ -0,0 +1,90 @@
+import os
+import unittest
+
+from assets import fingerprint_assets, fingerprint_name
+from build_manifest import BuildManifest, hash_file
+from fixtures import TempDirTestCase
+from link_check import check_site_links
+from static_sync import sync_static
+
+
+class TestAssets(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.dir, "static")
+        self.docs = os.path.join(self.dir, "docs")
+        os.mkdir(self.docs)
+        self.css = self.write("static/index.css", "body {}")
+        self.image = self.write("static/images/a.png", "png")
+        self.text = self.write("static/robots.txt", "")
+
+    def test_fingerprint_name(self):
+        self.assertEqual(fingerprint_name("/a/index.css", "0123456789abcdef"), "/a/index.0123456789.css")
+
+    def test_fingerprint_assets(self):
+        assets = fingerprint_assets(self.static)
+        css_name = fingerprint_name("/index.css", hash_file(self.css))
+        self.assertEqual(
+            assets.urls,
+            {"/index.css": css_name, "/images/a.png": fingerprint_name("/images/a.png", hash_file(self.image))},
+        )
+        self.assertEqual(assets.sources[self.css], (css_name[1:], hash_file(self.css)))
+        self.assertNotIn(self.text, assets.sources)
+        digest = assets.digest
+        self.write("static/index.css", "p {}")
+        self.assertNotEqual(fingerprint_assets(self.static).digest, digest)
+
+    def test_sync_static_uses_fingerprinted_names(self):
+        assets = fingerprint_assets(self.static)
+        manifest = BuildManifest()
+        self.assertEqual(sync_static(self.static, self.docs, manifest, assets=assets), (3, 0))
+        css_output = os.path.join(self.docs, assets.urls["/index.css"][1:])
+        self.assertTrue(os.path.exists(css_output))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "robots.txt")))
+        self.assertEqual(manifest.current[css_output]["source_hash"], hash_file(self.css))
+
+    def test_sync_static_rewrites_stylesheet_urls(self):
+        self.write("static/index.css", 'body { background: url("images/a.png"); } p { background: url(/b.png); }')
+        assets = fingerprint_assets(self.static)
+        manifest = BuildManifest()
+        sync_static(self.static, self.docs, manifest, assets=assets)
+        css_output = os.path.join(self.docs, assets.urls["/index.css"][1:])
+        image_url = assets.urls["/images/a.png"]
+        self.assertEqual(
+            self.read(css_output), f'body {{ background: url("{image_url[1:]}"); }} p {{ background: url(/b.png); }}'
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.docs, image_url[1:])))
+
+        # A renamed image rewrites the stylesheet even though it is unchanged.
+        self.write("static/images/a.png", "new png")
+        assets = fingerprint_assets(self.static)
+        manifest = BuildManifest(manifest.current)
+        sync_static(self.static, self.docs, manifest, assets=assets)
+        self.assertIn(assets.urls["/images/a.png"][1:], self.read(css_output))
+        self.assertNotEqual(assets.urls["/images/a.png"], image_url)
+
+    def test_fingerprint_reuses_hashes_of_previous_build(self):
+        manifest = BuildManifest()
+        previous = fingerprint_assets(self.static)
+        sync_static(self.static, self.docs, manifest, assets=previous)
+        # Same size and mtime: the hash recorded by the previous build is trusted.
+        stat = os.stat(self.css)
+        self.write("static/index.css", "body{}!")
+        os.utime(self.css, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assets = fingerprint_assets(self.static, BuildManifest(manifest.current))
+        self.assertEqual(assets.urls, previous.urls)
+        self.assertNotEqual(fingerprint_assets(self.static).urls, previous.urls)
+
+    def test_link_check_resolves_referenced_urls(self):
+        assets = fingerprint_assets(self.static)
+        manifest = BuildManifest()
+        sync_static(self.static, self.docs, manifest, assets=assets)
+        page = os.path.join(self.docs, "index.html")
+        metadata = {page: {"source": "index.md", "links": [["/index.css", 1], ["/b.png", 2]], "anchors": []}}
+        broken = check_site_links([page, *manifest.current], self.docs, metadata, assets=assets)
+        self.assertEqual(broken, [("index.md", 2, "/b.png")])
+
+
+if __name__ == "__main__":
+    unittest.main()
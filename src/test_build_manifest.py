@@ -0,0 +1,83 @@
+import os
+import unittest
+
+from build_manifest import BuildManifest, hash_file, remove_stale_outputs, remove_untracked_outputs
+from fixtures import TempDirTestCase
+
+
+class TestBuildManifest(TempDirTestCase):
+    def test_hash_file(self):
+        a = self.write("a.md", "# A")
+        b = self.write("b.md", "# A")
+        c = self.write("c.md", "# C")
+        self.assertEqual(hash_file(a), hash_file(b))
+        self.assertNotEqual(hash_file(a), hash_file(c))
+
+    def test_check_unchanged(self):
+        output = self.write("docs/index.html", "<p>hi</p>")
+        record = {"source": "index.md", "source_hash": "abc"}
+        manifest = BuildManifest({output: record})
+        self.assertFalse(manifest.check(output, dict(record)))
+        self.assertTrue(manifest.check(output, {"source": "index.md", "source_hash": "def"}))
+
+    def test_check_missing_output(self):
+        output = os.path.join(self.dir, "docs", "missing.html")
+        record = {"source": "missing.md", "source_hash": "abc"}
+        manifest = BuildManifest({output: record})
+        self.assertTrue(manifest.check(output, record))
+
+    def test_explain(self):
+        output = self.write("docs/index.html", "<p>hi</p>")
+        previous = {"deps": {"index.md": "a", "template.html": "b"}, "basepath": "/"}
+        manifest = BuildManifest({output: previous})
+        self.assertEqual(manifest.explain(output, dict(previous)), [])
+        record = {"deps": {"index.md": "a", "template.html": "c", "head.html": "d"}, "basepath": "/x/"}
+        self.assertEqual(
+            manifest.explain(output, record),
+            ["basepath changed", "new dependency head.html", "template.html changed"],
+        )
+        self.assertEqual(manifest.explain("docs/new.html", record), ["new output"])
+
+    def test_explain_failed(self):
+        output = self.write("docs/index.html", "<p>old</p>")
+        manifest = BuildManifest({output: {"source": "index.md", "failed": True}})
+        self.assertEqual(manifest.explain(output, {"source": "index.md"}), ["previous build failed"])
+
+    def test_save_and_load(self):
+        path = os.path.join(self.dir, "manifest.json")
+        manifest = BuildManifest()
+        manifest.check("docs/index.html", {"source_hash": "abc"})
+        manifest.save(path)
+        loaded = BuildManifest.load(path)
+        self.assertEqual(loaded.previous, {"docs/index.html": {"source_hash": "abc"}})
+        self.assertEqual(loaded.current, {})
+
+    def test_load_missing(self):
+        manifest = BuildManifest.load(os.path.join(self.dir, "nope.json"))
+        self.assertEqual(manifest.previous, {})
+
+    def test_remove_stale_outputs(self):
+        docs = os.path.join(self.dir, "docs")
+        kept = self.write("docs/index.html", "kept")
+        stale = self.write("docs/old/post/index.html", "stale")
+        manifest = BuildManifest({kept: {}, stale: {}})
+        manifest.check(kept, {})
+        remove_stale_outputs(manifest, docs)
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(stale))
+        self.assertFalse(os.path.exists(os.path.join(docs, "old")))
+
+    def test_remove_untracked_outputs(self):
+        docs = os.path.join(self.dir, "docs")
+        kept = self.write("docs/blog/index.html", "kept")
+        untracked = self.write("docs/old/post/index.html", "untracked")
+        manifest = BuildManifest()
+        manifest.check(kept, {})
+        remove_untracked_outputs(manifest, docs)
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(untracked))
+        self.assertFalse(os.path.exists(os.path.join(docs, "old")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import unittest
+
+from file_io import AtomicWriter, Prefetcher, WriteBehind, replay, write_if_changed, write_output
+from fixtures import TempDirTestCase
+
+
+class TestFileIO(TempDirTestCase):
+    def write_atomically(self, path, text):
+        with AtomicWriter(path) as file:
+            file.write(text)
+
+    def test_atomic_writer(self):
+        path = os.path.join(self.dir, "a", "b", "index.html")
+        self.write_atomically(path, "<p>hi</p>")
+        self.assertEqual(self.read(path), "<p>hi</p>")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["index.html"])
+
+    def test_atomic_writer_keeps_old_file_on_error(self):
+        path = os.path.join(self.dir, "index.html")
+        self.write_atomically(path, "old")
+        with self.assertRaises(RuntimeError):
+            with AtomicWriter(path) as file:
+                file.write("half")
+                raise RuntimeError("render failed")
+        self.assertEqual(self.read(path), "old")
+        self.assertEqual(os.listdir(self.dir), ["index.html"])
+
+    def test_atomic_writer_recreates_removed_directory(self):
+        path = os.path.join(self.dir, "gone", "index.html")
+        self.write_atomically(path, "one")
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+        self.write_atomically(path, "two")
+        self.assertEqual(self.read(path), "two")
+
+    def test_write_if_changed(self):
+        path = os.path.join(self.dir, "out", "index.html")
+        self.assertTrue(write_if_changed(path, ["<p>", "hi", "</p>"]))
+        os.utime(path, ns=(0, 0))
+        self.assertFalse(write_if_changed(path, ["<p>hi", "</p>"]))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertTrue(write_if_changed(path, ["<p>ho</p>"]))
+        self.assertEqual(self.read(path), "<p>ho</p>")
+        self.assertNotEqual(os.stat(path).st_mtime_ns, 0)
+
+    def test_write_if_changed_compares_chunk_by_chunk(self):
+        path = self.write("index.html", "<p>one</p><p>two</p><p>three</p>")
+        self.assertTrue(write_if_changed(path, ["<p>one</p>", "<p>2</p>", "<p>three</p>"]))
+        self.assertEqual(self.read(path), "<p>one</p><p>2</p><p>three</p>")
+        # A prefix or an extension of the existing file is a change too.
+        self.assertTrue(write_if_changed(path, ["<p>one</p>"]))
+        self.assertEqual(self.read(path), "<p>one</p>")
+        self.assertTrue(write_if_changed(path, ["<p>one</p>", "<p>é</p>"]))
+        self.assertEqual(self.read(path), "<p>one</p><p>é</p>")
+        self.assertEqual(os.listdir(self.dir), ["index.html"])
+
+    def test_write_output_keeps_file_on_render_error(self):
+        path = self.write("index.html", "<p>one</p><p>two</p>")
+
+        def render(write):
+            write("<p>one</p>")
+            write("<p>2</p>")
+            raise RuntimeError("render failed")
+
+        with self.assertRaises(RuntimeError):
+            write_output(path, render)
+        self.assertEqual(self.read(path), "<p>one</p><p>two</p>")
+        self.assertEqual(os.listdir(self.dir), ["index.html"])
+
+    def test_prefetcher(self):
+        paths = []
+        for i in range(10):
+            path = os.path.join(self.dir, f"{i}.md")
+            with open(path, "w") as file:
+                file.write(str(i))
+            paths.append(path)
+        paths.insert(3, os.path.join(self.dir, "missing.md"))
+        results = []
+        with Prefetcher(paths, threads=3, ahead=2) as prefetcher:
+            for future in prefetcher:
+                try:
+                    results.append(future.result())
+                except FileNotFoundError:
+                    results.append(None)
+        expected = [str(i).encode() for i in range(10)]
+        expected.insert(3, None)
+        self.assertEqual(results, expected)
+
+    def test_write_behind(self):
+        blocker = os.path.join(self.dir, "file")
+        with open(blocker, "w") as file:
+            file.write("not a directory")
+        with WriteBehind(threads=2, max_pending=1) as writer:
+            for i in range(5):
+                writer.write(os.path.join(self.dir, "out", f"{i}.html"), replay([str(i)]))
+            writer.write(os.path.join(blocker, "x.html"), replay(["x"]), "x.md")
+        self.assertEqual(sorted(os.listdir(os.path.join(self.dir, "out"))), [f"{i}.html" for i in range(5)])
+        self.assertEqual(len(writer.errors), 1)
+        self.assertEqual(writer.errors[0][0], "x.md")
+        self.assertEqual((writer.stats.changed, writer.stats.unchanged), (5, 0))
+
+        with WriteBehind(threads=2) as writer:
+            for i in range(5):
+                writer.write(os.path.join(self.dir, "out", f"{i}.html"), replay([str(i % 2)]))
+        self.assertEqual((writer.stats.changed, writer.stats.unchanged), (3, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import io
+import os
+import tempfile
+import unittest
+
+from front_matter import read_front_matter, read_front_matter_file, slot_values, timestamp
+from markdown_ast import MarkdownError
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_read_front_matter(self):
+        file = io.StringIO(
+            "---\n"
+            'title: "Tom: a mystery"\n'
+            "date: 2024-03-01\n"
+            "tags:\n"
+            "  - lotr\n"
+            "  - tom\n"
+            "draft: yes\n"
+            "slug: tom-bombadil\n"
+            "template: post.html\n"
+            "---\n"
+            "# Body\n"
+        )
+        fields, body, lines = read_front_matter(file)
+        self.assertEqual(
+            fields,
+            {
+                "title": "Tom: a mystery",
+                "date": "2024-03-01",
+                "tags": ["lotr", "tom"],
+                "draft": True,
+                "slug": "tom-bombadil",
+                "template": "post.html",
+            },
+        )
+        self.assertEqual((body, lines), ([], 10))
+        # The body is left unread.
+        self.assertEqual(file.read(), "# Body\n")
+
+    def test_flow_lists_and_comma_separated_tags(self):
+        self.assertEqual(read_front_matter(io.StringIO("---\ntags: [a, 'b c']\n---\n"))[0], {"tags": ["a", "b c"]})
+        self.assertEqual(read_front_matter(io.StringIO("---\ntags: a, b\n---\n"))[0], {"tags": ["a", "b"]})
+
+    def test_without_front_matter(self):
+        file = io.StringIO("# Title\n\nText\n")
+        self.assertEqual(read_front_matter(file), ({}, ["# Title\n"], 0))
+        self.assertEqual(read_front_matter(io.StringIO("")), ({}, [], 0))
+
+    def test_errors(self):
+        cases = [
+            ("---\ntitle: a\n\ndraft: maybe\n---\n", "4:1: front matter draft must be true or false, not 'maybe'"),
+            ("---\ndate: soon\n---\n", "2:1: front matter date is not an ISO 8601 date: 'soon'"),
+            ("---\nslug: a/b\n---\n", "2:1: front matter slug is not a valid file name: 'a/b'"),
+            ("---\njust text\n---\n", "2:1: invalid front matter line: 'just text'"),
+            ("---\ntitle: a\n", "1:1: front matter not closed"),
+        ]
+        for text, message in cases:
+            with self.subTest(text=text):
+                with self.assertRaises(MarkdownError) as cm:
+                    read_front_matter(io.StringIO(text))
+                self.assertEqual(str(cm.exception), message)
+
+    def test_read_front_matter_file_reports_path(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "page.md")
+            with open(path, "w") as file:
+                file.write("---\ndraft: maybe\n---\n")
+            with self.assertRaises(MarkdownError) as cm:
+                read_front_matter_file(path)
+            self.assertTrue(str(cm.exception).startswith(f"{path}:2:1: "))
+
+    def test_slot_values(self):
+        self.assertEqual(slot_values({}), {"Date": "", "Tags": ""})
+        self.assertEqual(
+            slot_values({"title": "T", "date": "2024-03-01", "tags": ["a", "b & c"], "author": "<me>"}),
+            {"Date": "2024-03-01", "Tags": "a, b &amp; c", "Author": "&lt;me&gt;"},
+        )
+        # The page fills Title and Content itself.
+        self.assertEqual(slot_values({"content": "x"}), {"Date": "", "Tags": ""})
+
+    def test_timestamp(self):
+        self.assertEqual(timestamp("2024-03-01"), "2024-03-01T00:00:00Z")
+        self.assertEqual(timestamp("2024-03-01T10:30:00+02:00"), "2024-03-01T08:30:00Z")
+
+
+if __name__ == "__main__":
+    unittest.main()
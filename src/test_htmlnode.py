@@ -108,6 +108,32 @@ class TestHTMLNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
         )
 
+    def test_slots(self):
+        for node in [
+            HTMLNode("p", "text"),
+            LeafNode("b", "bold"),
+            ParentNode("div", [LeafNode(None, "text")]),
+        ]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_write_html(self):
+        node = ParentNode(
+            "p",
+            [LeafNode("a", "link", {"href": "/x"}), LeafNode(None, " text")],
+            {"class": "intro"},
+        )
+        chunks = []
+        node.write_html(chunks.append)
+        self.assertEqual(
+            chunks,
+            ['<p class="intro">', '<a href="/x">', "link", "</a>", " text", "</p>"],
+        )
+        self.assertEqual("".join(chunks), node.to_html())
+
+    def test_write_html_no_children(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", None).write_html([].append)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,112 @@
+import os
+import struct
+import unittest
+import zlib
+from unittest import mock
+
+import images
+from fixtures import TempDirTestCase
+from assets import fingerprint_assets
+from build_manifest import BuildManifest, hash_file
+from images import ImageIndex, image_size, process_images, variant_name
+from template import Template
+
+
+def png(width, height):
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + b"\xff\x00\x00" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+class TestImages(TempDirTestCase):
+    def test_image_size(self):
+        self.assertEqual(image_size(self.write("a.png", png(3, 2))), (3, 2))
+        self.assertEqual(image_size(self.write("a.gif", b"GIF89a\x05\x00\x04\x00" + b"\x00" * 16)), (5, 4))
+        jpeg = b"\xff\xd8" + b"\xff\xe0\x00\x04\x00\x00" + b"\xff\xc0\x00\x11\x08\x00\x07\x00\x09" + b"\x00" * 12
+        self.assertEqual(image_size(self.write("a.jpg", jpeg)), (9, 7))
+        self.assertIsNone(image_size(self.write("a.txt", b"not an image")))
+
+    def test_variant_name(self):
+        self.assertEqual(variant_name("/images/tom.png", 480), "/images/tom-480w.png")
+
+    def test_rewrite(self):
+        index = ImageIndex("/site/")
+        index.add("/images/a.png", 1200, 600, [("/images/a-480w.png", 480)])
+        index.add("/images/b.png", 100, 50)
+        html = index.rewrite(
+            '<p><img src="/images/a.png" alt="a"><img src="/images/b.png" alt="b">'
+            '<img src="https://example.com/c.png" alt="c"></p>'
+        )
+        self.assertEqual(
+            html,
+            '<p><img src="/images/a.png" srcset="/site/images/a-480w.png 480w, /site/images/a.png 1200w"'
+            ' sizes="(max-width: 1200px) 100vw, 1200px" width="1200" height="600" loading="lazy" alt="a">'
+            '<img src="/images/b.png" width="100" height="50" loading="lazy" alt="b">'
+            '<img src="https://example.com/c.png" alt="c"></p>',
+        )
+
+    def test_template_rewrites_images(self):
+        index = ImageIndex("/site/")
+        index.add("/images/b.png", 100, 50)
+        template = Template("<article>{{ Content }}</article>", "/site/", images=index)
+        chunks = []
+        template.stream(chunks.append, Content='<img src="/images/b.png" alt="b">')
+        self.assertEqual(
+            "".join(chunks),
+            '<article><img src="/site/images/b.png" width="100" height="50" loading="lazy" alt="b"></article>',
+        )
+
+    def test_process_images_without_pillow(self):
+        self.write("static/images/a.png", png(640, 480))
+        self.write("static/index.css", b"body {}")
+        with mock.patch.object(images, "Image", None):
+            index = process_images(
+                os.path.join(self.dir, "static"), os.path.join(self.dir, "docs"), os.path.join(self.dir, "cache")
+            )
+        self.assertEqual(index.images, {"/images/a.png": (640, 480, ())})
+        self.assertIsNotNone(index.digest)
+
+    @unittest.skipIf(images.Image is None, "Pillow is not installed")
+    def test_process_images_with_pillow(self):
+        self.write("static/images/a.png", png(640, 480))
+        docs = os.path.join(self.dir, "docs")
+        cache = os.path.join(self.dir, "cache")
+        index = process_images(os.path.join(self.dir, "static"), docs, cache)
+        self.assertEqual(index.images["/images/a.png"], (640, 480, (("/images/a-480w.png", 480),)))
+        self.assertEqual(image_size(os.path.join(docs, "images", "a-480w.png")), (480, 360))
+        self.assertEqual(len(os.listdir(cache)), 1)
+
+    def test_process_images_reuses_source_hashes(self):
+        source = self.write("static/images/a.png", png(640, 480))
+        static = os.path.join(self.dir, "static")
+        docs = os.path.join(self.dir, "docs")
+        cache = os.path.join(self.dir, "cache")
+
+        def make_variant(source, width, height, destination):
+            self.write(destination, b"variant")
+
+        def build(manifest, assets=None):
+            with mock.patch.object(images, "Image", mock.Mock()), mock.patch.object(images, "make_variant", make_variant):
+                with mock.patch.object(images, "hash_file", wraps=hash_file) as hashed:
+                    process_images(static, docs, cache, manifest=manifest, assets=assets)
+            return [call.args[0] for call in hashed.call_args_list]
+
+        manifest = BuildManifest()
+        self.assertEqual(build(manifest), [source])
+        manifest = BuildManifest(manifest.current)
+        self.assertEqual(build(manifest), [])
+        self.assertEqual(build(BuildManifest(), fingerprint_assets(static)), [])
+        # A modified image is hashed again.
+        os.utime(source, ns=(0, 0))
+        self.assertEqual(build(BuildManifest(manifest.current)), [source])
+
+
+if __name__ == "__main__":
+    unittest.main()
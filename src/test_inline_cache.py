@@ -0,0 +1,50 @@
+import unittest
+
+import markdown_blocks
+from inline_cache import InlineCache
+from markdown_blocks import markdown_to_html_node, set_inline_cache
+
+
+class TestInlineCache(unittest.TestCase):
+    def test_get_put(self):
+        cache = InlineCache()
+        self.assertIsNone(cache.get("**a**"))
+        cache.put("**a**", "<b>a</b>")
+        self.assertEqual(cache.get("**a**"), "<b>a</b>")
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["bytes"], len("**a**") + len("<b>a</b>"))
+
+    def test_evicts_least_recently_used(self):
+        cache = InlineCache(max_entries=2)
+        cache.put("a", "a")
+        cache.put("b", "b")
+        cache.get("a")
+        cache.put("c", "c")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+    def test_max_bytes(self):
+        cache = InlineCache(max_bytes=10)
+        cache.put("aaa", "aaa")
+        cache.put("bbb", "bbb")
+        self.assertEqual(list(cache.entries), ["bbb"])
+        self.assertEqual(cache.bytes, 6)
+        cache.put("c" * 20, "c")
+        self.assertNotIn("c" * 20, cache.entries)
+
+    def test_markdown_with_cache(self):
+        md = "# Hi\n\n- a **b** [c](/d)\n- a **b** [c](/d)\n\na **b** [c](/d)"
+        expected = markdown_to_html_node(md).to_html()
+        cache = InlineCache()
+        set_inline_cache(cache)
+        try:
+            self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        finally:
+            set_inline_cache(None)
+        self.assertIsNone(markdown_blocks.inline_cache)
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
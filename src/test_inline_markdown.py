@@ -1,9 +1,11 @@
+import random
 import unittest
 from inline_markdown import (
     split_nodes_delimiter,
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
+    text_to_textnodes_legacy,
     extract_markdown_links,
     extract_markdown_images,
 )
@@ -191,6 +193,43 @@ class TestInlineMarkdown(unittest.TestCase):
             nodes,
         )
 
+    def test_text_to_textnodes_legacy_flag(self):
+        text = "**bold** and [link](https://boot.dev)"
+        self.assertListEqual(
+            text_to_textnodes_legacy(text), text_to_textnodes(text, legacy=True)
+        )
+        self.assertListEqual(text_to_textnodes(text, legacy=True), text_to_textnodes(text))
+
+    def test_text_to_textnodes_unclosed(self):
+        for text in ["a **b", "a _b", "a `b", "_a **b** c_", "`a_b`"]:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+
+    def test_text_to_textnodes_image_inside_link(self):
+        text = "a[b](![)c](d)"
+        self.assertListEqual(
+            [
+                TextNode("a[b](", TextType.TEXT),
+                TextNode(")c", TextType.IMAGE, "d"),
+            ],
+            text_to_textnodes(text),
+        )
+
+    def test_text_to_textnodes_matches_legacy(self):
+        pieces = ["a", " ", "**", "*", "_", "`", "[", "]", "(", ")", "!", "![", "]("]
+        rng = random.Random(0)
+        for _ in range(5000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 20)))
+            try:
+                expected = text_to_textnodes_legacy(text)
+            except ValueError:
+                expected = ValueError
+            try:
+                actual = text_to_textnodes(text)
+            except ValueError:
+                actual = ValueError
+            self.assertEqual(expected, actual, text)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
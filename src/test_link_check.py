@@ -0,0 +1,63 @@
+import unittest
+
+from link_check import LinkIndex, check_site_links, extract_anchors, extract_links, source_line
+from template import Template
+
+
+class TestLinkCheck(unittest.TestCase):
+    def setUp(self):
+        self.index = LinkIndex(
+            "docs",
+            ["docs/index.html", "docs/blog/tom/index.html", "docs/index.css", "docs/images/a b.png"],
+        )
+        self.index.add_anchors("docs/blog/tom/index.html", ["songs"])
+
+    def test_extract(self):
+        html = '<a href="/a">x</a><img src="/b.png" alt=""><a href="/a" id="top">y</a>'
+        self.assertEqual(extract_links(html), ["/a", "/b.png"])
+        self.assertEqual(extract_anchors(html), ["top"])
+
+    def test_source_line(self):
+        text = "# Title\n\n[a](/a)\n\n![b](/b.png)"
+        self.assertEqual(source_line(text, "/b.png"), 5)
+        self.assertIsNone(source_line(text, "/c"))
+
+    def test_check(self):
+        for url in [
+            "/",
+            "/blog/tom",
+            "/blog/tom/",
+            "/blog/tom/index.html#songs",
+            "/blog/tom/#songs",
+            "/index.css?v=2",
+            "/images/a%20b.png",
+            "https://example.com/missing",
+            "mailto:tom@example.com",
+        ]:
+            self.assertTrue(self.index.check(url, "/index.html"), url)
+        for url in ["/blog/glorfindel", "/blog/tom/#missing", "/images/a.png"]:
+            self.assertFalse(self.index.check(url, "/index.html"), url)
+
+    def test_check_relative(self):
+        page = "/blog/tom/index.html"
+        self.assertTrue(self.index.check("../../index.css", page))
+        self.assertTrue(self.index.check("#songs", page))
+        self.assertFalse(self.index.check("#missing", page))
+        self.assertFalse(self.index.check("index.css", page))
+
+    def test_check_site_links(self):
+        metadata = {
+            "docs/index.html": {
+                "source": "content/index.md",
+                "links": [["/blog/tom", 3], ["/blog/nope", 5]],
+                "anchors": [],
+            },
+        }
+        template = Template('<link href="/index.css" /><script src="/missing.js"></script>', path="t.html")
+        outputs = ["docs/index.html", "docs/blog/tom/index.html", "docs/index.css"]
+        broken = check_site_links(outputs, "docs", metadata, [template])
+        self.assertEqual(broken, [("content/index.md", 5, "/blog/nope"), ("t.html", 1, "/missing.js")])
+
+
+if __name__ == "__main__":
+    unittest.main()
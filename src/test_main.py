@@ -0,0 +1,152 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+
+from build_manifest import BuildManifest
+from fixtures import TempDirTestCase
+from main import BuildError, generate_site_pages, main
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+class TestGenerateSitePages(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = self.write("template.html", TEMPLATE)
+        self.content = self.path("content")
+        self.docs = self.path("docs")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post.md", "# Post\n\nSome *text*")
+
+    def build(self, manifest=None, **kwargs):
+        return generate_site_pages(self.content, self.template, self.docs, "/", manifest=manifest, **kwargs)
+
+    def test_rebuilds_pages_of_another_generator_version(self):
+        manifest = BuildManifest()
+        self.assertEqual(self.build(manifest).changed, 2)
+        manifest = BuildManifest(manifest.current)
+        self.assertEqual(self.build(manifest).unchanged, 0)
+        previous = manifest.current
+        previous[self.path("docs/index.html")]["generator"] = "0"
+        manifest = BuildManifest(previous)
+        # Only the page built by the other version is rendered again.
+        stats = self.build(manifest)
+        self.assertEqual((stats.changed, stats.unchanged), (0, 1))
+
+    def read_outputs(self):
+        outputs = {}
+        for root, _, files in os.walk(self.docs):
+            for file in files:
+                path = os.path.join(root, file)
+                outputs[os.path.relpath(path, self.docs)] = self.read(path)
+        return outputs
+
+    def test_parallel_build_matches_serial_build(self):
+        # Enough pages for several batches, with failures in two of them.
+        for i in range(150):
+            self.write(f"content/blog/{i:03}.md", f"# Post {i}\n\n[home](/) and **bold {i}**")
+        bad = self.write("content/blog/010.md", "# Bad\n\nunclosed **bold")
+        untitled = self.write("content/blog/120.md", "No title")
+        results = []
+        for jobs in (1, 2):
+            with self.assertRaises(BuildError) as cm:
+                self.build(jobs=jobs, io_threads=1)
+            results.append((cm.exception.failures, self.read_outputs()))
+            for path in results[-1][1]:
+                os.remove(os.path.join(self.docs, path))
+        self.assertEqual(results[0], results[1])
+        failures, outputs = results[0]
+        self.assertEqual(
+            failures,
+            [
+                (bad, f"{bad}:3:10: invalid markdown, formatted section not closed"),
+                (untitled, "Exception: No h1 header found in markdown"),
+            ],
+        )
+        self.assertEqual(len(outputs), 150)
+        self.assertNotIn("blog/010.html", outputs)
+        self.assertEqual(
+            outputs["blog/007.html"],
+            '<title>Post 7</title><div><h1>Post 7</h1><p><a href="/">home</a> and <b>bold 7</b></p></div>',
+        )
+
+    def test_failed_page_keeps_previous_output_and_metadata(self):
+        post = self.path("content/blog/post.md")
+        html = self.path("docs/blog/post.html")
+        manifest = BuildManifest()
+        metadata = {}
+        self.build(manifest, metadata=metadata)
+        built = self.read(html)
+        meta = metadata[html]
+
+        self.write("content/blog/post.md", "# Post\n\nunclosed **bold")
+        manifest = BuildManifest(manifest.current)
+        metadata = {}
+        with self.assertRaises(BuildError) as cm:
+            self.build(manifest, metadata=metadata)
+        self.assertEqual([path for path, _ in cm.exception.failures], [post])
+        self.assertEqual(self.read(html), built)
+        self.assertEqual(manifest.current[html], {"source": post, "failed": True, "meta": meta})
+        self.assertEqual(metadata[html], meta)
+
+        # The next build retries the page even if its source is unchanged.
+        manifest = BuildManifest(manifest.current)
+        with self.assertRaises(BuildError):
+            self.build(manifest, explain=True)
+        self.write("content/blog/post.md", "# Fixed")
+        manifest = BuildManifest(manifest.current)
+        stats = self.build(manifest)
+        self.assertEqual(stats.changed, 1)
+        self.assertNotIn("failed", manifest.current[html])
+        self.assertEqual(self.read(html), "<title>Fixed</title><div><h1>Fixed</h1></div>")
+
+
+class TestMain(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("template.html", TEMPLATE)
+        self.write("static/index.css", "body {}")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post.md", "# Post")
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+
+    def run_main(self, *args):
+        with self.assertRaises(SystemExit) as cm:
+            main(["--incremental", "--site-url", "https://example.com", "-j", "1", *args])
+        return cm.exception.code
+
+    def test_keep_going(self):
+        main(["--incremental", "--site-url", "https://example.com", "-j", "1"])
+        self.write("content/blog/post.md", "unclosed **bold")
+        self.write("content/about.md", "# About")
+        self.assertEqual(self.run_main("-k"), 1)
+        # The rest of the build is finished: pages, artifacts and manifest.
+        self.assertEqual(self.read("docs/about.html"), "<title>About</title><div><h1>About</h1></div>")
+        self.assertEqual(self.read("docs/blog/post.html"), "<title>Post</title><div><h1>Post</h1></div>")
+        self.assertIn("https://example.com/about.html", self.read("docs/sitemap.xml"))
+        self.assertIn("https://example.com/blog/post.html", self.read("docs/sitemap.xml"))
+        with open(self.path(".build_manifest.json")) as file:
+            outputs = json.load(file)["outputs"]
+        self.assertTrue(outputs[os.path.join("docs", "blog", "post.html")]["failed"])
+        self.assertIn(os.path.join("docs", "about.html"), outputs)
+
+    def test_check_links_checks_every_template(self):
+        self.write("post.html", '<a href="/missing.html">x</a>{{ Content }}')
+        self.write("content/blog/post.md", "---\ntemplate: post.html\n---\n# Post")
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.assertEqual(self.run_main("--check-links"), 1)
+        self.assertIn("post.html:1: broken link /missing.html", stderr.getvalue())
+
+    def test_failure_without_keep_going(self):
+        self.write("content/blog/post.md", "unclosed **bold")
+        self.assertEqual(self.run_main(), 1)
+        self.assertFalse(os.path.exists(self.path("docs/sitemap.xml")))
+        self.assertFalse(os.path.exists(self.path(".build_manifest.json")))
+
+
+if __name__ == "__main__":
+    unittest.main()
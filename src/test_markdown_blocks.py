@@ -1,10 +1,18 @@
+import io
+import random
 import unittest
 from markdown_blocks import (
+    BlockReader,
+    extract_title,
+    markdown_file_to_html_node,
     markdown_to_html_node,
     markdown_to_blocks,
     block_to_block_type,
     BlockType,
+    parse_markdown,
 )
+from inline_markdown import text_to_textnodes
+from markdown_ast import MarkdownError
 
 
 class TestMarkdownToHTML(unittest.TestCase):
@@ -163,6 +171,73 @@ the **same** even with inline stuff
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_block_reader(self):
+        md = "# Title\n\nSome **text**\nmore\n\n\n\n- a\n- b\n"
+        reader = BlockReader(io.StringIO(md))
+        self.assertEqual(
+            list(reader),
+            [
+                ("# Title", BlockType.HEADING),
+                ("Some **text**\nmore", BlockType.PARAGRAPH),
+                ("- a\n- b", BlockType.ULIST),
+            ],
+        )
+        self.assertEqual(reader.title, "Title")
+
+    def test_block_reader_matches_split(self):
+        lines = ["", "", " ", "text", "# h1", "> quote", "- item", "```", "1. one"]
+        rng = random.Random(0)
+        for _ in range(2000):
+            md = "\n".join(rng.choice(lines) for _ in range(rng.randint(0, 12)))
+            if rng.random() < 0.5:
+                md += "\n"
+            reader = BlockReader(io.StringIO(md))
+            self.assertEqual([block for block, _ in reader], markdown_to_blocks(md), repr(md))
+            try:
+                title = extract_title(md)
+            except Exception:
+                title = None
+            self.assertEqual(reader.title, title, repr(md))
+
+    def test_markdown_file_to_html_node(self):
+        md = "# Title\n\nA _paragraph_\n\n> a quote\n"
+        node, title = markdown_file_to_html_node(io.StringIO(md))
+        self.assertEqual(title, "Title")
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+
+    def test_parse_markdown_positions(self):
+        md = "# Title\n\n  Some **bold**\nand _it_\n\n- a\n- [b](/b)\n\n> one\n>   **two**\n"
+        document = parse_markdown(io.StringIO(md))
+        self.assertEqual(document.title, "Title")
+        heading, paragraph, ulist, quote = document.children
+        self.assertEqual(
+            (heading.block_type, heading.line, heading.column, heading.level), (BlockType.HEADING, 1, 1, 1)
+        )
+        self.assertEqual((paragraph.line, paragraph.column), (3, 3))
+        nodes = text_to_textnodes(paragraph.text, source_map=paragraph.source_map)
+        # The newline joined into a space keeps its position at the end of line 3.
+        self.assertEqual(
+            [(node.text, *node.position) for node in nodes],
+            [("Some ", 3, 3), ("bold", 3, 8), (" and ", 3, 16), ("it", 4, 5)],
+        )
+        self.assertEqual(
+            [(item.line, item.column, item.text) for item in ulist.children], [(6, 1, "a"), (7, 1, "[b](/b)")]
+        )
+        link = text_to_textnodes(ulist.children[1].text, source_map=ulist.children[1].source_map)[0]
+        self.assertEqual((link.url, *link.position), ("/b", 7, 3))
+        self.assertEqual(quote.text, "one **two**")
+        bold = text_to_textnodes(quote.text, source_map=quote.source_map)[1]
+        self.assertEqual((bold.text, *bold.position), ("two", 10, 5))
+
+    def test_markdown_error_location(self):
+        with self.assertRaises(MarkdownError) as context:
+            markdown_file_to_html_node(io.StringIO("# T\n\n> a\n> b _c\n"))
+        self.assertIsInstance(context.exception, ValueError)
+        self.assertEqual((context.exception.line, context.exception.column), (4, 5))
+        self.assertEqual(str(context.exception), "4:5: invalid markdown, formatted section not closed")
+        context.exception.path = "post.md"
+        self.assertEqual(str(context.exception), "post.md:4:5: invalid markdown, formatted section not closed")
+
 
 if __name__ == "__main__":
     unittest.main()
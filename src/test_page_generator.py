@@ -0,0 +1,173 @@
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from inline_cache import InlineCache
+from markdown_blocks import set_inline_cache
+from page_generator import (
+    PIPELINE_DEPTH,
+    PROCESS_BYTES,
+    PipelineLimits,
+    batch_pages,
+    generate_pages,
+)
+from profiler import BuildProfiler
+from render_cache import RenderCache
+from template import Template
+
+
+TEMPLATE = '<title>{{ Title }}</title><a href="/">home</a><article>{{ Content }}</article>'
+
+
+class TestGeneratePages(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = self.write("template.html", TEMPLATE)
+
+    def test_generate_pages(self):
+        source = self.write("content/index.md", "# Hello\n\nSome **bold** text")
+        dest = os.path.join(self.dir, "docs", "index.html")
+        failures = generate_pages([(source, dest)], Template.from_file(self.template, "/blog/"))
+        self.assertEqual(failures, [])
+        self.assertEqual(
+            self.read(dest),
+            '<title>Hello</title><a href="/blog/">home</a><article><div><h1>Hello</h1>'
+            "<p>Some <b>bold</b> text</p></div></article>",
+        )
+
+    def test_generate_pages_reports_failures(self):
+        bad = self.write("content/bad.md", "# Bad\n\nunclosed **bold")
+        good = self.write("content/good.md", "# Good")
+        bad_dest = os.path.join(self.dir, "docs", "bad.html")
+        good_dest = os.path.join(self.dir, "docs", "good.html")
+        failures = generate_pages(
+            [(bad, bad_dest), (good, good_dest)], Template.from_file(self.template)
+        )
+        self.assertEqual(
+            failures,
+            [(bad, f"{bad}:3:10: invalid markdown, formatted section not closed")],
+        )
+        self.assertFalse(os.path.exists(bad_dest))
+        self.assertTrue(os.path.exists(good_dest))
+
+    def test_generate_pages_with_front_matter(self):
+        template = self.write("post.html", "<title>{{ Title }}</title><p>{{ Date }} {{ Tags }}</p>{{ Content }}")
+        source = self.write(
+            "content/post.md", "---\ntitle: From front matter\ndate: 2024-03-01\ntags: [a, b]\n---\nNo **h1**"
+        )
+        bad = self.write("content/bad.md", "---\ntitle: Bad\n---\n\nunclosed **bold")
+        dest = os.path.join(self.dir, "docs", "post.html")
+        metadata = {}
+        for io_threads in (0, 1):
+            failures = generate_pages(
+                [(source, dest), (bad, os.path.join(self.dir, "docs", "bad.html"))],
+                Template.from_file(template),
+                io_threads=io_threads,
+                metadata=metadata,
+            )
+            # Positions count the lines of the front matter.
+            self.assertEqual(failures, [(bad, f"{bad}:5:10: invalid markdown, formatted section not closed")])
+            self.assertEqual(
+                self.read(dest),
+                "<title>From front matter</title><p>2024-03-01 a, b</p><div><p>No <b>h1</b></p></div>",
+            )
+        self.assertEqual(metadata[dest]["updated"], "2024-03-01T00:00:00Z")
+        self.assertEqual(metadata[dest]["tags"], ["a", "b"])
+
+    def test_generate_pages_front_matter_cannot_fill_page_slots(self):
+        source = self.write("content/page.md", "---\ncontent: x\n---\n# Hello")
+        dest = os.path.join(self.dir, "docs", "page.html")
+        failures = generate_pages([(source, dest)], Template.from_file(self.template))
+        self.assertEqual(failures, [])
+        self.assertEqual(
+            self.read(dest), '<title>Hello</title><a href="/">home</a><article><div><h1>Hello</h1></div></article>'
+        )
+
+    def test_generate_pages_profile_stages(self):
+        pages = [(self.write("content/index.md", "# Hello"), self.path("docs/index.html"))]
+        template = Template.from_file(self.template)
+        profiler = BuildProfiler()
+        generate_pages(pages, template, profiler)
+        self.assertEqual(set(profiler.stages), {"read", "parse", "render", "write"})
+        # A hit in the render cache still reads the front matter.
+        cache = RenderCache(self.path("cache"))
+        for _ in range(2):
+            profiler = BuildProfiler()
+            generate_pages(pages, template, profiler, cache)
+            self.assertEqual(set(profiler.stages), {"read", "parse", "render_cache", "render", "write"})
+        self.assertEqual(profiler.stages["parse"][1], 1)
+
+    def test_generate_pages_io_threads(self):
+        sources = [self.write(f"content/{i}.md", f"# Page {i}") for i in range(6)]
+        sources.insert(2, self.write("content/bad.md", "no title"))
+        pages = [(source, source.replace("content", "docs").replace(".md", ".html")) for source in sources]
+        failures = generate_pages(pages, Template.from_file(self.template), io_threads=2)
+        self.assertEqual(failures, [(sources[2], "Exception: No h1 header found in markdown")])
+        for i in range(6):
+            self.assertIn(f"<title>Page {i}</title>", self.read(os.path.join(self.dir, "docs", f"{i}.html")))
+
+    def test_generate_pages_collects_metadata(self):
+        source = self.write("content/index.md", "# Hello\n\nSome **bold** text")
+        dest = os.path.join(self.dir, "docs", "index.html")
+        metadata = {}
+        generate_pages([(source, dest)], Template.from_file(self.template), io_threads=1, metadata=metadata)
+        self.assertEqual(list(metadata), [dest])
+        self.assertEqual(metadata[dest]["excerpt"], "Some bold text")
+        self.assertEqual(metadata[dest]["words"], 4)
+
+    def test_generate_pages_link_lines(self):
+        source = self.write("content/index.md", "# Hello\n\n[x](/about)\n\n[y](/a) and ![z](/about)")
+        dest = self.path("docs/index.html")
+        cache = RenderCache(self.path("cache"))
+        # Parsed, then a render cache miss and a hit, then with the inline cache.
+        template = Template.from_file(self.template)
+        for render_cache, inline_cache in ((None, None), (cache, None), (cache, None), (None, InlineCache(10))):
+            metadata = {}
+            set_inline_cache(inline_cache)
+            try:
+                for _ in range(2):
+                    generate_pages([(source, dest)], template, render_cache=render_cache, metadata=metadata)
+            finally:
+                set_inline_cache(None)
+            self.assertEqual(metadata[dest]["links"], [["/about", 3], ["/a", 5]])
+
+    def test_batch_pages(self):
+        pages = [
+            (self.write(f"content/{i}.md", "x" * 10), f"docs/{i}.html")
+            for i in range(5)
+        ]
+        self.assertEqual(
+            batch_pages(pages, max_bytes=25, max_pages=10),
+            [pages[0:2], pages[2:4], pages[4:5]],
+        )
+        self.assertEqual(
+            batch_pages(pages, max_bytes=1000, max_pages=3),
+            [pages[0:3], pages[3:5]],
+        )
+        self.assertEqual(batch_pages([]), [])
+
+    def test_pipeline_limits_from_budget(self):
+        mb = 1024 * 1024
+        limits = PipelineLimits.from_budget(2048 * mb, 4, 100 * 1024, 10 * 1024)
+        self.assertEqual((limits.jobs, limits.in_flight, limits.depth), (4, 8, PIPELINE_DEPTH))
+        # Too small for four workers and their pages.
+        limits = PipelineLimits.from_budget(6 * PROCESS_BYTES, 4, 10 * 1024, 10 * 1024)
+        self.assertEqual(limits.jobs, 2)
+        # Queues shrink to leave room for rendering a large page, but never vanish.
+        limits = PipelineLimits.from_budget(64 * mb, 1, 512 * 1024, 100 * 1024)
+        self.assertEqual(limits.jobs, 1)
+        self.assertLess(limits.depth, PIPELINE_DEPTH)
+        self.assertEqual(PipelineLimits.from_budget(mb, 1, 10 * mb, mb).depth, 1)
+
+    def test_generate_pages_with_depth(self):
+        pages = [
+            (self.write(f"content/{i}.md", f"# Page {i}"), os.path.join(self.dir, f"docs/{i}.html"))
+            for i in range(5)
+        ]
+        failures = generate_pages(pages, Template.from_file(self.template), io_threads=1, depth=1)
+        self.assertEqual(failures, [])
+        self.assertTrue(all(os.path.exists(dest) for _, dest in pages))
+
+
+if __name__ == "__main__":
+    unittest.main()
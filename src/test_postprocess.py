@@ -0,0 +1,108 @@
+import gzip
+import os
+import unittest
+
+from build_manifest import BuildManifest
+from file_io import InlineWriter, WriteBehind, replay
+from fixtures import TempDirTestCase
+from postprocess import PostProcessor, minify_css, minify_html
+from static_sync import sync_static
+
+
+class TestMinify(unittest.TestCase):
+    def test_minify_html(self):
+        html = "<html>\n  <body>\n    <p>Some   <b>bold</b>\n text</p>\n  </body>\n</html>\n"
+        self.assertEqual(minify_html(html), "<html><body><p>Some <b>bold</b> text</p></body></html>")
+
+    def test_minify_html_keeps_pre(self):
+        html = "<div>\n  <pre><code>a  =  1\n  b</code></pre>\n</div>"
+        self.assertEqual(minify_html(html), "<div><pre><code>a  =  1\n  b</code></pre></div>")
+
+    def test_minify_html_keeps_tags(self):
+        html = '<a href="x"  title="a  b">link</a>'
+        self.assertEqual(minify_html(html), html)
+
+    def test_minify_css(self):
+        css = "/* layout */\nbody {\n  margin: 0;\n  font-family: a, b;\n}\na :hover { color: red; }\n"
+        self.assertEqual(minify_css(css), "body{margin:0;font-family:a,b}a :hover{color:red}")
+
+    def test_minify_css_keeps_strings(self):
+        css = 'a::before { content: "  /* x */  "; }'
+        self.assertEqual(minify_css(css), 'a::before{content:"  /* x */  "}')
+
+
+class TestPostProcessor(TempDirTestCase):
+    def test_process_only_minifies_html_and_css(self):
+        postprocessor = PostProcessor(minify=True)
+        self.assertEqual(postprocessor.process("a.html", ["<p>\n", "a</p>\n"]), ["<p> a</p>"])
+        self.assertEqual(postprocessor.process("a.js", ["a  =  1"]), ["a  =  1"])
+        self.assertEqual(PostProcessor().process("a.html", ["<p>\n"]), ["<p>\n"])
+
+    def test_compress_writes_fresh_siblings(self):
+        path = self.path("index.html")
+        with open(path, "w") as file:
+            file.write("<p>hello</p>" * 100)
+        postprocessor = PostProcessor(precompress=True)
+        self.assertEqual(postprocessor.compress(path), len(postprocessor.formats))
+        with gzip.open(path + ".gz", "rb") as file, open(path, "rb") as original:
+            self.assertEqual(file.read(), original.read())
+        self.assertEqual(postprocessor.compress(path), 0)
+        with open(path, "w") as file:
+            file.write("<p>changed</p>")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(postprocessor.compress(path), len(postprocessor.formats))
+        with gzip.open(path + ".gz", "rb") as file:
+            self.assertEqual(file.read(), b"<p>changed</p>")
+
+    def test_compress_skips_binary_files(self):
+        path = self.path("a.png")
+        with open(path, "wb") as file:
+            file.write(b"png")
+        self.assertEqual(PostProcessor(precompress=True).compress(path), 0)
+        self.assertFalse(os.path.exists(path + ".gz"))
+
+    def test_register(self):
+        manifest = BuildManifest()
+        manifest.current[self.path("a.html")] = {"source": "a.md"}
+        manifest.current[self.path("a.png")] = {"source": "a.png"}
+        PostProcessor(precompress=True).register(manifest)
+        self.assertIn(self.path("a.html.gz"), manifest.current)
+        self.assertNotIn(self.path("a.png.gz"), manifest.current)
+
+    def test_writers(self):
+        postprocessor = PostProcessor(minify=True, precompress=True)
+        for writer in (InlineWriter(postprocessor=postprocessor), WriteBehind(1, postprocessor=postprocessor)):
+            path = self.path(f"{type(writer).__name__}.html")
+            writer.write(path, replay(["<p>\n", "a</p>\n"]))
+            if isinstance(writer, WriteBehind):
+                self.assertEqual(writer.close(), [])
+            with open(path) as file:
+                self.assertEqual(file.read(), "<p> a</p>")
+            with gzip.open(path + ".gz", "rt") as file:
+                self.assertEqual(file.read(), "<p> a</p>")
+
+    def test_sync_static_minifies_stylesheets(self):
+        static = self.path("static")
+        docs = self.path("docs")
+        os.makedirs(static)
+        os.makedirs(docs)
+        with open(os.path.join(static, "index.css"), "w") as file:
+            file.write("body {\n  margin: 0;\n}\n")
+        postprocessor = PostProcessor(minify=True, precompress=True)
+        manifest = BuildManifest()
+        self.assertEqual(sync_static(static, docs, manifest, postprocessor=postprocessor), (1, 0))
+        with open(os.path.join(docs, "index.css")) as file:
+            self.assertEqual(file.read(), "body{margin:0}")
+        self.assertTrue(os.path.exists(os.path.join(docs, "index.css.gz")))
+        manifest = BuildManifest(manifest.current)
+        self.assertEqual(sync_static(static, docs, manifest, postprocessor=postprocessor), (0, 1))
+        # Turning minification off copies the original again.
+        manifest = BuildManifest(manifest.current)
+        self.assertEqual(sync_static(static, docs, manifest), (1, 0))
+        with open(os.path.join(docs, "index.css")) as file:
+            self.assertEqual(file.read(), "body {\n  margin: 0;\n}\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
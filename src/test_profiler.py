@@ -0,0 +1,55 @@
+import io
+import unittest
+
+from profiler import NULL_PROFILER, BuildProfiler, TimedFile
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_stage_and_page(self):
+        profiler = BuildProfiler()
+        with profiler.page("a.md"):
+            with profiler.stage("parse"):
+                pass
+            with profiler.stage("parse"):
+                pass
+        self.assertEqual(profiler.stages["parse"][1], 2)
+        self.assertEqual(profiler.pages["a.md"][1], 1)
+        self.assertGreaterEqual(profiler.pages["a.md"][0], profiler.stages["parse"][0])
+
+    def test_merge(self):
+        first = BuildProfiler()
+        second = BuildProfiler()
+        first.stages["read"] = [1.0, 2]
+        second.stages["read"] = [0.5, 1]
+        second.pages["b.md"] = [0.25, 1]
+        first.merge(second)
+        self.assertEqual(first.stages, {"read": [1.5, 3]})
+        self.assertEqual(first.pages, {"b.md": [0.25, 1]})
+
+    def test_report(self):
+        profiler = BuildProfiler()
+        profiler.stages = {"read": [0.1, 2], "parse": [0.3, 2]}
+        profiler.pages = {"slow.md": [0.3, 1], "fast.md": [0.1, 1]}
+        lines = profiler.report(top=1).splitlines()
+        self.assertTrue(lines[1].startswith("parse"))
+        self.assertTrue(lines[2].startswith("read"))
+        self.assertIn("slowest 1 of 2 pages:", lines)
+        self.assertTrue(lines[-1].endswith("slow.md"))
+
+    def test_timed_file(self):
+        profiler = BuildProfiler()
+        file = TimedFile(io.StringIO("a\nb\n"), profiler)
+        with file.stage("parse"):
+            self.assertEqual(file.readline(), "a\n")
+            self.assertEqual(list(file), ["b\n"])
+        self.assertEqual(set(profiler.stages), {"parse", "read"})
+        self.assertEqual(profiler.stages["read"][0], file.seconds)
+
+    def test_null_profiler(self):
+        with NULL_PROFILER.stage("read"):
+            with NULL_PROFILER.page("a.md"):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
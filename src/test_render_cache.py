@@ -0,0 +1,54 @@
+import os
+import time
+import unittest
+
+from fixtures import TempDirTestCase
+from render_cache import RenderCache
+
+
+class TestRenderCache(TempDirTestCase):
+    def test_get_put(self):
+        cache = RenderCache(self.dir)
+        key = cache.key(b"# Title")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "Title", "<div><h1>Title</h1></div>", [("/a", 3)])
+        self.assertEqual(cache.get(key), ("Title", "<div><h1>Title</h1></div>", [("/a", 3)]))
+        self.assertEqual(RenderCache(self.dir).get(key), ("Title", "<div><h1>Title</h1></div>", [("/a", 3)]))
+
+    def test_get_invalid_entry(self):
+        cache = RenderCache(self.dir)
+        key = cache.key(b"# Title")
+        entries = ('{"title": "T"', '{"title": "T", "html": ""}', "[]", '{"title": "T", "html": "", "links": 1}')
+        for content in entries:
+            self.write(cache.path(key), content)
+            self.assertIsNone(cache.get(key))
+
+    def test_key(self):
+        cache = RenderCache(self.dir)
+        self.assertEqual(cache.key(b"# Title"), RenderCache(self.path("other")).key(b"# Title"))
+        self.assertNotEqual(cache.key(b"# Title"), cache.key(b"# Other"))
+
+    def test_key_file(self):
+        cache = RenderCache(self.dir)
+        self.assertEqual(cache.key_file(self.write("page.md", b"# Title")), cache.key(b"# Title"))
+
+    def test_evict(self):
+        cache = RenderCache(os.path.join(self.dir, "cache"))
+        keys = [cache.key(str(i).encode()) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, "t", "x" * 100)
+            stamp = time.time() - 100 + i
+            os.utime(cache.path(key), (stamp, stamp))
+        size = os.path.getsize(cache.path(keys[0]))
+        cache.max_bytes = size * 2
+        self.assertEqual(cache.evict(), (2, size * 2))
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+    def test_evict_missing_directory(self):
+        cache = RenderCache(os.path.join(self.dir, "missing"))
+        self.assertEqual(cache.evict(), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
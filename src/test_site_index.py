@@ -0,0 +1,99 @@
+import json
+import os
+import unittest
+
+from build_manifest import BuildManifest
+from fixtures import TempDirTestCase
+from site_index import (
+    METADATA_FIELDS,
+    atom_feed,
+    decode_search_index,
+    has_fields,
+    page_metadata,
+    page_url,
+    plain_text,
+    search_index,
+    write_site_artifacts,
+)
+
+
+class TestSiteIndex(TempDirTestCase):
+    def test_plain_text(self):
+        self.assertEqual(
+            plain_text("<h1>Title</h1><p>A <b>bold</b> &amp; <a href=\"/x\">link</a>.</p>"),
+            " Title  A bold & link. ",
+        )
+
+    def test_page_metadata(self):
+        source = self.write("content/index.md", "# Title")
+        meta = page_metadata(source, "Title", "<h1>Title</h1><p>Hello hello <i>world</i> a</p>")
+        self.assertEqual(meta["title"], "Title")
+        self.assertEqual(meta["excerpt"], "Hello hello world a")
+        self.assertEqual(meta["words"], 5)
+        self.assertEqual(meta["terms"], "hello title world")
+        self.assertEqual(meta["links"], [])
+        self.assertTrue(has_fields(meta, METADATA_FIELDS))
+
+    def test_page_metadata_fields(self):
+        source = self.write("content/index.md", "# Title")
+        meta = page_metadata(source, "Title", '<h1 id="t">Title</h1><a href="/x">x</a>', fields=())
+        self.assertNotIn("terms", meta)
+        self.assertNotIn("links", meta)
+        self.assertTrue(has_fields(meta, ()))
+        self.assertFalse(has_fields(meta, ("links",)))
+        self.assertFalse(has_fields({**meta, "version": 0}, ()))
+
+    def test_page_url(self):
+        self.assertEqual(page_url("docs/index.html", "docs", "/"), "/")
+        self.assertEqual(page_url("docs/blog/tom/index.html", "docs", "/site/"), "/site/blog/tom/")
+        self.assertEqual(page_url("docs/about.html", "docs", "/"), "/about.html")
+
+    def test_search_index_round_trip(self):
+        pages = [
+            ("/a/", {"title": "A", "excerpt": "", "words": 2, "terms": "tolkien tom"}),
+            ("/b/", {"title": "B", "excerpt": "", "words": 1, "terms": "tolkien"}),
+            ("/c/", {"title": "C", "excerpt": "", "words": 2, "terms": "hobbit tom"}),
+        ]
+        index = search_index(pages)
+        self.assertEqual(index["prefixes"], [0, 0, 2])
+        self.assertEqual(index["suffixes"], ["hobbit", "tolkien", "m"])
+        self.assertEqual(index["postings"], [[2], [0, 1], [0, 2]])
+        self.assertEqual(decode_search_index(index), {"hobbit": [2], "tolkien": [0, 1], "tom": [0, 2]})
+
+    def test_write_site_artifacts(self):
+        docs = os.path.join(self.dir, "docs")
+        content = os.path.join(self.dir, "content")
+        home = self.write("content/index.md", "# Home")
+        post = self.write("content/blog/post/index.md", "# Post")
+        metadata = {
+            os.path.join(docs, "index.html"): page_metadata(home, "Home", "<h1>Home</h1>"),
+            os.path.join(docs, "blog", "post", "index.html"): page_metadata(post, "Post", "<p>Tom</p>"),
+        }
+        manifest = BuildManifest()
+        written = write_site_artifacts(metadata, docs, "/", content, "https://example.com/", True, manifest)
+        self.assertEqual(sorted(manifest.current), sorted(written))
+        with open(os.path.join(docs, "sitemap.xml")) as file:
+            sitemap = file.read()
+        self.assertIn("<loc>https://example.com/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/blog/post/</loc>", sitemap)
+        with open(os.path.join(docs, "feed.xml")) as file:
+            feed = file.read()
+        self.assertIn("<title>Home</title>", feed)
+        self.assertIn("<author><name>Home</name></author>", feed)
+        self.assertEqual(feed.count("<entry>"), 1)
+        self.assertIn('<link href="https://example.com/blog/post/" />', feed)
+        with open(os.path.join(docs, "search.json")) as file:
+            index = json.load(file)
+        self.assertEqual(decode_search_index(index)["tom"], [1])
+
+    def test_atom_feed_author(self):
+        post = self.write("content/blog/post.md", "# Post")
+        pages = [("/blog/post/", page_metadata(post, "Post", "<p>Tom</p>"))]
+        feed = atom_feed(pages, "https://example.com", "/feed.xml", "Home", "Tom & Goldberry")
+        self.assertIn("<author><name>Tom &amp; Goldberry</name></author>", feed)
+        # The feed has an author even without entries.
+        self.assertIn("<author><name>Home</name></author>", atom_feed([], "https://example.com", "/feed.xml", "Home"))
+
+
+if __name__ == "__main__":
+    unittest.main()
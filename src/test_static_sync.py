@@ -0,0 +1,64 @@
+import os
+import unittest
+
+from build_manifest import BuildManifest
+from fixtures import TempDirTestCase
+from static_sync import place_file, sync_static
+
+
+class TestStaticSync(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.dir, "static")
+        self.docs = os.path.join(self.dir, "docs")
+        os.mkdir(self.docs)
+        self.css = self.write("static/index.css", "body {}")
+        self.image = self.write("static/images/a.png", "png")
+
+    def test_sync_skips_unchanged(self):
+        self.assertEqual(sync_static(self.static, self.docs), (2, 0))
+        self.assertEqual(self.read("docs/images/a.png"), "png")
+        self.assertEqual(sync_static(self.static, self.docs), (0, 2))
+        self.write("static/index.css", "p {}")
+        self.assertEqual(sync_static(self.static, self.docs), (1, 1))
+        self.assertEqual(self.read("docs/index.css"), "p {}")
+
+    def test_sync_with_manifest(self):
+        manifest = BuildManifest()
+        self.assertEqual(sync_static(self.static, self.docs, manifest), (2, 0))
+        manifest = BuildManifest(manifest.current)
+        self.assertEqual(sync_static(self.static, self.docs, manifest), (0, 2))
+
+    def test_sync_without_previous_build_compares_outputs(self):
+        sync_static(self.static, self.docs)
+        self.assertEqual(sync_static(self.static, self.docs, BuildManifest()), (0, 2))
+        self.assertEqual(sync_static(self.static, self.docs, BuildManifest(), check="hash"), (0, 2))
+        self.write("docs/index.css", "stale")
+        self.assertEqual(sync_static(self.static, self.docs, BuildManifest(), check="hash"), (1, 1))
+        self.assertEqual(self.read("docs/index.css"), "body {}")
+
+    def test_sync_hash_ignores_touch(self):
+        manifest = BuildManifest()
+        sync_static(self.static, self.docs, manifest, check="hash")
+        stat = os.stat(self.css)
+        os.utime(self.css, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        manifest = BuildManifest(manifest.current)
+        self.assertEqual(sync_static(self.static, self.docs, manifest, check="hash"), (0, 2))
+
+    def test_place_file_hardlink(self):
+        destination = os.path.join(self.docs, "index.css")
+        place_file(self.css, destination, "hardlink")
+        self.assertTrue(os.path.samefile(self.css, destination))
+        # Replacing a hardlinked output must not modify the source.
+        other = self.write("other.css", "other")
+        place_file(other, destination, "copy")
+        self.assertEqual(self.read("static/index.css"), "body {}")
+
+    def test_place_file_reflink_falls_back(self):
+        destination = os.path.join(self.docs, "index.css")
+        place_file(self.css, destination, "reflink")
+        self.assertEqual(self.read("docs/index.css"), "body {}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+
+from assets import AssetMap
+from template import Template, rewrite_urls
+
+
+class TestTemplate(unittest.TestCase):
+    def test_rewrite_urls(self):
+        html = '<a href="/blog">x</a><img src="/a.png"><a href="https://x.com">y</a>'
+        self.assertEqual(
+            rewrite_urls(html, "/site/"),
+            '<a href="/site/blog">x</a><img src="/site/a.png"><a href="https://x.com">y</a>',
+        )
+        self.assertEqual(rewrite_urls(html, "/"), html)
+
+    def test_rewrite_urls_with_assets(self):
+        assets = AssetMap()
+        assets.add("/index.css", "static/index.css", "0123456789abcdef")
+        html = '<link href="/index.css"><a href="/index.css#x">x</a><img src="/a.png">'
+        self.assertEqual(
+            rewrite_urls(html, "/site/", assets),
+            '<link href="/site/index.0123456789.css"><a href="/site/index.0123456789.css#x">x</a>'
+            '<img src="/site/a.png">',
+        )
+        self.assertEqual(rewrite_urls(html, "/", assets).count("index.0123456789.css"), 2)
+
+    def test_compile(self):
+        template = Template('<link href="/index.css"><title>{{ Title }}</title>{{ Content }}!', "/site/")
+        self.assertEqual(
+            template.segments, ['<link href="/site/index.css"><title>', "</title>", "!"]
+        )
+        self.assertEqual(
+            template.slots, [("Title", "{{ Title }}"), ("Content", "{{ Content }}")]
+        )
+
+    def test_render(self):
+        template = Template('<link href="/index.css"><title>{{ Title }}</title>{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render(Title="Home", Content='<a href="/about">about</a>'),
+            '<link href="/site/index.css"><title>Home</title><a href="/site/about">about</a>',
+        )
+
+    def test_render_repeated_slot(self):
+        template = Template("{{ Title }} - {{ Title }}")
+        self.assertEqual(template.render(Title="Home"), "Home - Home")
+
+    def test_render_missing_slot(self):
+        template = Template("<h1>{{ Title }}</h1>{{ Footer }}")
+        self.assertEqual(template.render(Title="Home"), "<h1>Home</h1>{{ Footer }}")
+
+    def test_stream(self):
+        template = Template('<link href="/index.css"><title>{{ Title }}</title>{{ Content }}', "/site/")
+        node = ParentNode("p", [LeafNode("a", "about", {"href": "/about"})])
+        chunks = []
+        template.stream(chunks.append, Title="Home", Content=node)
+        self.assertEqual(
+            "".join(chunks),
+            template.render(Title="Home", Content=node.to_html()),
+        )
+
+    def test_partials(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.mkdir(os.path.join(tmp, "partials"))
+            with open(os.path.join(tmp, "partials", "head.html"), "w") as file:
+                file.write('<link href="/index.css">{{> title.html }}')
+            with open(os.path.join(tmp, "partials", "title.html"), "w") as file:
+                file.write("<title>{{ Title }}</title>")
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as file:
+                file.write("<head>{{> partials/head.html }}</head>{{ Content }}")
+            template = Template.from_file(path, "/site/")
+            self.assertEqual(
+                template.render(Title="Home", Content="<p>hi</p>"),
+                '<head><link href="/site/index.css"><title>Home</title></head><p>hi</p>',
+            )
+            self.assertEqual(
+                template.dependencies,
+                [
+                    path,
+                    os.path.join(tmp, "partials", "head.html"),
+                    os.path.join(tmp, "partials", "title.html"),
+                ],
+            )
+
+    def test_partial_cycle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "loop.html")
+            with open(path, "w") as file:
+                file.write("{{> loop.html }}")
+            with self.assertRaises(ValueError):
+                Template.from_file(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
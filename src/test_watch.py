@@ -0,0 +1,105 @@
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from watch import DevSite, LiveReload, Watcher, diff, scan
+
+
+class TestWatch(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home")
+        self.write("static/index.css", "body {}")
+
+    def site(self):
+        return DevSite(
+            self.path("content"), self.path("static"), self.path("template.html"), self.path("docs")
+        )
+
+    def test_scan_and_diff(self):
+        old = scan(self.path("content"), {})
+        self.assertEqual(list(old), [self.path("content/index.md")])
+        self.write("content/about.md", "# About")
+        os.remove(self.path("content/index.md"))
+        new = scan(self.path("content"), {})
+        self.assertEqual(
+            diff(old, new), ({self.path("content/about.md")}, {self.path("content/index.md")})
+        )
+
+    def test_watcher_poll(self):
+        watcher = Watcher([self.path("content"), self.path("template.html")], debounce=0)
+        self.assertEqual(watcher.poll(), (set(), set()))
+        self.write("content/post.md", "# Post")
+        self.assertEqual(watcher.poll(), ({self.path("content/post.md")}, set()))
+        self.assertEqual(watcher.poll(), (set(), set()))
+
+    def test_apply(self):
+        site = self.site()
+        site.build_all()
+        self.assertEqual(self.read("docs/index.html"), "<title>Home</title><div><h1>Home</h1></div>")
+        post = self.write("content/blog/post.md", "# Post")
+        css = self.write("static/index.css", "p {}")
+        site.apply({post, css}, set())
+        self.assertEqual(self.read("docs/blog/post.html"), "<title>Post</title><div><h1>Post</h1></div>")
+        self.assertEqual(self.read("docs/index.css"), "p {}")
+        os.remove(post)
+        site.apply(set(), {post})
+        self.assertFalse(os.path.exists(self.path("docs/blog/post.html")))
+
+    def test_apply_hardlinked_static_file(self):
+        site = self.site()
+        site.build_all()
+        css = self.path("static/index.css")
+        os.remove(self.path("docs/index.css"))
+        os.link(css, self.path("docs/index.css"))
+        self.write("static/index.css", "p {}")
+        site.apply({css}, set())
+        self.assertEqual(self.read("docs/index.css"), "p {}")
+
+    def test_apply_template(self):
+        site = self.site()
+        site.build_all()
+        template = self.write("template.html", "<h2>{{ Title }}</h2>")
+        site.apply({template}, set())
+        self.assertEqual(self.read("docs/index.html"), "<h2>Home</h2>")
+
+    def test_apply_broken_template(self):
+        site = self.site()
+        site.build_all()
+        for text in ("{{> missing.html }}", "{{> template.html }}"):
+            template = self.write("template.html", text)
+            site.apply({template}, set())
+            self.assertEqual(self.read("docs/index.html"), "<title>Home</title><div><h1>Home</h1></div>")
+        # The last template that compiled is kept for pages that change.
+        page = self.write("content/index.md", "# Changed")
+        site.apply({page}, set())
+        self.assertEqual(self.read("docs/index.html"), "<title>Changed</title><div><h1>Changed</h1></div>")
+
+    def test_apply_front_matter(self):
+        site = self.site()
+        site.build_all()
+        self.write("post.html", "<h2>{{ Title }}</h2>")
+        post = self.write("content/blog/post.md", "---\nslug: renamed\ntemplate: post.html\n---\n# Post")
+        site.apply({post}, set())
+        self.assertEqual(self.read("docs/blog/renamed.html"), "<h2>Post</h2>")
+        template = self.write("post.html", "<h3>{{ Title }}</h3>")
+        site.apply({template}, set())
+        self.assertEqual(self.read("docs/blog/renamed.html"), "<h3>Post</h3>")
+        self.write("content/blog/post.md", "---\nslug: moved\n---\n# Post")
+        site.apply({post}, set())
+        self.assertEqual(self.read("docs/blog/moved.html"), "<title>Post</title><div><h1>Post</h1></div>")
+        self.assertFalse(os.path.exists(self.path("docs/blog/renamed.html")))
+        os.remove(post)
+        site.apply(set(), {post})
+        self.assertFalse(os.path.exists(self.path("docs/blog/moved.html")))
+
+    def test_livereload(self):
+        livereload = LiveReload()
+        self.assertEqual(livereload.wait("1", timeout=0), "1")
+        livereload.notify()
+        self.assertEqual(livereload.wait("1", timeout=0), "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
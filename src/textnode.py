@@ -12,10 +12,25 @@ class TextType(Enum):
 
 
 class TextNode:
-    def __init__(self, text, text_type, url=None):
+    __slots__ = ("text", "text_type", "url", "offset", "source_map")
+
+    def __init__(self, text, text_type, url=None, offset=None, source_map=None):
         self.text = text
         self.text_type = text_type
         self.url = url
+        # Offset of the node in the inline text of its block, and the block's
+        # SourceMap, so the source position is only computed when asked for.
+        self.offset = offset
+        self.source_map = source_map
+
+    @property
+    def position(self):
+        """
+        (line, column) of the node in the markdown source, or None if unknown.
+        """
+        if self.source_map is None:
+            return None
+        return self.source_map.position(self.offset)
 
     def __eq__(self, other):
         return (
@@ -0,0 +1,287 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from front_matter import read_front_matter_file
+from main import copy_static, output_path
+from page_generator import generate_page
+from static_sync import place_file
+from template import Template
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = (
+    "<script>(function poll(v){fetch('" + LIVERELOAD_PATH + "?v='+v)"
+    ".then(function(r){return r.text()})"
+    ".then(function(n){if(v&&n!==v){location.reload()}else{poll(n)}})"
+    ".catch(function(){setTimeout(function(){poll(v)},1000)})})('')</script>"
+)
+
+
+def scan(path, snapshot):
+    """
+    Adds (mtime_ns, size) for path, or for every file below it, to snapshot.
+    """
+    try:
+        if not os.path.isdir(path):
+            stat = os.stat(path)
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            return snapshot
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    scan(entry.path, snapshot)
+                else:
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        pass
+    return snapshot
+
+
+def diff(old, new):
+    """
+    Returns the paths that were added or modified and the paths that were removed.
+    """
+    changed = {path for path, stat in new.items() if old.get(path) != stat}
+    removed = {path for path in old if path not in new}
+    return changed, removed
+
+
+class Watcher:
+    """
+    Polls a set of files and directories for changes. A burst of changes is
+    reported once, after nothing has changed for `debounce` seconds.
+    """
+
+    def __init__(self, paths, interval=0.1, debounce=0.05):
+        self.paths = paths
+        self.interval = interval
+        self.debounce = debounce
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for path in self.paths:
+            scan(path, snapshot)
+        return snapshot
+
+    def poll(self):
+        current = self.scan()
+        if current == self.snapshot:
+            return set(), set()
+        while True:
+            time.sleep(self.debounce)
+            settled = self.scan()
+            if settled == current:
+                break
+            current = settled
+        changed, removed = diff(self.snapshot, current)
+        self.snapshot = current
+        return changed, removed
+
+    def wait(self):
+        while True:
+            changed, removed = self.poll()
+            if changed or removed:
+                return changed, removed
+            time.sleep(self.interval)
+
+
+class LiveReload:
+    """
+    Version counter that long-polling browsers wait on to learn about rebuilds.
+    """
+
+    def __init__(self):
+        self.version = 1
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout=30):
+        with self.condition:
+            self.condition.wait_for(lambda: str(self.version) != version, timeout)
+            return str(self.version)
+
+
+class DevSite:
+    """
+    Keeps the compiled template and the site layout in memory and applies
+    changes to content, static files or the template with targeted rebuilds.
+    Drafts are built too, and pages use the template and slug set in their
+    front matter.
+    """
+
+    def __init__(self, content_dir, static_dir, template_path, docs_dir, basepath="/"):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.docs_dir = docs_dir
+        self.basepath = basepath
+        self.template = Template.from_file(template_path, basepath)
+        self.templates = {None: self.template}
+        # Output of every page rendered, which its slug may have moved.
+        self.outputs = {}
+
+    def page_template(self, name):
+        if name not in self.templates:
+            path = os.path.join(os.path.dirname(self.template_path), name)
+            self.templates[name] = Template.from_file(path, self.basepath)
+        return self.templates[name]
+
+    def template_dependencies(self):
+        return {path for template in self.templates.values() for path in template.dependencies}
+
+    def build_all(self):
+        os.makedirs(self.docs_dir, exist_ok=True)
+        copy_static(self.static_dir, self.docs_dir)
+        for root, _, files in os.walk(self.content_dir):
+            for file in files:
+                if file.endswith(".md"):
+                    self.render(os.path.join(root, file))
+
+    def render(self, path):
+        try:
+            front = read_front_matter_file(path)
+            output = output_path(path, self.content_dir, self.docs_dir, front.get("slug"))
+            generate_page(path, self.page_template(front.get("template")), output)
+            previous = self.outputs.get(path)
+            if previous is not None and previous != output and os.path.exists(previous):
+                # Its slug changed.
+                print(f"Removing {previous}")
+                os.remove(previous)
+            self.outputs[path] = output
+        except Exception as e:
+            print(f"Error in {path}: {type(e).__name__}: {e}", file=sys.stderr)
+
+    def static_output(self, path):
+        return os.path.join(self.docs_dir, os.path.relpath(path, self.static_dir))
+
+    def watched_paths(self):
+        return [self.content_dir, self.static_dir, *sorted(self.template_dependencies())]
+
+    def in_dir(self, path, directory):
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(directory)]) == os.path.abspath(directory)
+
+    def apply(self, changed, removed):
+        if changed & self.template_dependencies():
+            print(f"Template {self.template_path} or its partials changed, rebuilding all pages")
+            try:
+                template = Template.from_file(self.template_path, self.basepath)
+            except (OSError, ValueError) as e:
+                # Pages keep the last template that compiled until it is fixed.
+                print(f"Error in {self.template_path}: {type(e).__name__}: {e}", file=sys.stderr)
+            else:
+                self.template = template
+                self.templates = {None: template}
+                changed = changed | {
+                    os.path.join(root, file)
+                    for root, _, files in os.walk(self.content_dir)
+                    for file in files
+                }
+        for path in sorted(removed):
+            if self.in_dir(path, self.content_dir) and path.endswith(".md"):
+                output = self.outputs.pop(path, None) or output_path(path, self.content_dir, self.docs_dir)
+            elif self.in_dir(path, self.static_dir):
+                output = self.static_output(path)
+            else:
+                continue
+            if os.path.exists(output):
+                print(f"Removing {output}")
+                os.remove(output)
+        for path in sorted(changed):
+            if self.in_dir(path, self.content_dir) and path.endswith(".md"):
+                self.render(path)
+            elif self.in_dir(path, self.static_dir):
+                output = self.static_output(path)
+                print(f"Copying {path} to {output}")
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                place_file(path, output)
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, livereload=None, **kwargs):
+        self.livereload = livereload
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if self.livereload is not None and url.path == LIVERELOAD_PATH:
+            version = parse_qs(url.query).get("v", [""])[0]
+            if version:
+                version = self.livereload.wait(version)
+            else:
+                version = str(self.livereload.version)
+            self.send_bytes(version.encode(), "text/plain")
+            return
+        path = self.translate_path(url.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if self.livereload is not None and path.endswith(".html") and os.path.isfile(path):
+            with open(path, "rb") as file:
+                body = file.read()
+            body = body.replace(b"</body>", LIVERELOAD_SCRIPT.encode() + b"</body>", 1)
+            self.send_bytes(body, "text/html; charset=utf-8")
+            return
+        super().do_GET()
+
+    def send_bytes(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.path.startswith(LIVERELOAD_PATH):
+            super().log_message(format, *args)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the site, serve docs/ and rebuild on changes.")
+    parser.add_argument("basepath", nargs="?", default="/", help="base path for URLs in the generated HTML")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between polls")
+    parser.add_argument("--debounce", type=float, default=0.05, help="seconds without changes before rebuilding")
+    parser.add_argument("--livereload", action="store_true", help="reload open pages after each rebuild")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    site = DevSite("content", "static", "template.html", "docs", args.basepath)
+    site.build_all()
+
+    livereload = LiveReload() if args.livereload else None
+    handler = partial(DevRequestHandler, directory=site.docs_dir, livereload=livereload)
+    server = ThreadingHTTPServer(("", args.port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {site.docs_dir} at http://localhost:{args.port}/")
+
+    watcher = Watcher(site.watched_paths(), args.interval, args.debounce)
+    try:
+        while True:
+            changed, removed = watcher.wait()
+            start = time.perf_counter()
+            site.apply(changed, removed)
+            # The template may have gained or lost partials.
+            watcher.paths = site.watched_paths()
+            print(f"Rebuilt in {(time.perf_counter() - start) * 1000:.1f} ms")
+            if livereload is not None:
+                livereload.notify()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()